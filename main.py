@@ -1,25 +1,43 @@
 import os
+import sys
+import re
 import uuid
+import hashlib
 import tempfile
-from datetime import datetime
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import aiofiles
-import requests
-import PyPDF2
-from docx import Document
-import io
 
 app = FastAPI(
     title="Plagiarism Detection API",
     description="Academic integrity checking service",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Upload limits
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_REQUEST_SIZE = MAX_FILE_SIZE + 64 * 1024  # Allow for multipart framing
+IO_BUFFER_SIZE = 64 * 1024  # 64KB chunks/buffers for upload and text I/O
+
+@app.middleware("http")
+async def reject_oversized_requests(request: Request, call_next):
+    """Reject requests whose declared size exceeds the limit before the body is read"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_SIZE:
+        return ORJSONResponse(status_code=413, content={"detail": "File too large. Maximum size: 10MB"})
+    return await call_next(request)
+
 # 🌐 CORS Configuration for web access
 app.add_middleware(
     CORSMiddleware,
@@ -29,29 +47,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ♻️ Analysis results for previously seen uploads, keyed by
+# (content hash, file extension); least recently used entries are evicted first
+ANALYSIS_CACHE_SIZE = 64
+analysis_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+# 📄 Responses only carry a preview of the extracted text; the full text of
+# recent documents is kept on disk, where every worker process can serve it
+ORIGINAL_TEXT_PREVIEW_SIZE = 4096
+DOCUMENT_TEXT_CACHE_SIZE = 64
+DOCUMENT_TEXT_PRUNE_INTERVAL = 16  # Texts stored by this worker between prunes
+DOCUMENT_TEXT_DIR = Path(
+    os.environ.get("DOCUMENT_TEXT_DIR", Path(tempfile.gettempdir()) / "plagiarism-document-texts")
+)
+# The texts are other users' uploads, so only this account may list or read
+# them; mkdir applies the umask and leaves an existing directory alone, and
+# chmod fails on a directory someone else created
+DOCUMENT_TEXT_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+DOCUMENT_TEXT_DIR.chmod(0o700)
+
+# PDFium is not thread-safe and extraction runs in the threadpool, so PDF
+# uploads take turns using it
+PDFIUM_LOCK = threading.Lock()
+
+# WordprocessingML elements read when extracting text from .docx files
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCX_PARAGRAPH_TAG = f"{WORD_NAMESPACE}p"
+DOCX_TEXT_TAG = f"{WORD_NAMESPACE}t"
+DOCX_TAB_TAG = f"{WORD_NAMESPACE}tab"
+DOCX_BREAK_TAGS = {f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"}
+
+def decode_text(data: bytes) -> str:
+    """Decode a plain-text upload the way reading it in text mode would"""
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n').strip()
+
 def extract_text_from_file(file_path: str, filename: str) -> str:
     """Extract text from different file types"""
     file_extension = Path(filename).suffix.lower()
     
     try:
         if file_extension == '.pdf':
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+            # Imported lazily so the PDF engine only loads when first needed
+            import pypdfium2 as pdfium
+            parts = []
+            with PDFIUM_LOCK:
+                pdf = pdfium.PdfDocument(file_path)
+                try:
+                    for page in pdf:
+                        textpage = page.get_textpage()
+                        try:
+                            # PDFium reports line breaks as \r\n; normalize to \n
+                            parts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                        finally:
+                            textpage.close()
+                            page.close()
+                finally:
+                    pdf.close()
+            return "\n".join(parts).strip()
         
         elif file_extension == '.docx':
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            # Stream text runs straight out of word/document.xml instead of
+            # building python-docx's object model for the whole document
+            paragraphs = []
+            runs = []
+            with zipfile.ZipFile(file_path) as docx, docx.open('word/document.xml') as document_xml:
+                for _, elem in ET.iterparse(document_xml):
+                    if elem.tag == DOCX_TEXT_TAG:
+                        runs.append(elem.text or "")
+                    elif elem.tag == DOCX_TAB_TAG:
+                        runs.append("\t")
+                    elif elem.tag in DOCX_BREAK_TAGS:
+                        runs.append("\n")
+                    elif elem.tag == DOCX_PARAGRAPH_TAG:
+                        paragraphs.append("".join(runs))
+                        runs.clear()
+                        elem.clear()
+            return "\n".join(paragraphs).strip()
         
         elif file_extension == '.txt':
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read().strip()
+            with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as file:
+                return decode_text(file.read())
         
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
@@ -59,24 +134,43 @@ def extract_text_from_file(file_path: str, filename: str) -> str:
     except Exception as e:
         raise Exception(f"Error extracting text: {str(e)}")
 
-def create_realistic_matches(text: str) -> List[Dict[str, Any]]:
-    """Create realistic matches with proper positioning"""
+# Common academic phrases: (pattern, matched source text, similarity)
+ACADEMIC_PATTERNS = [
+    ("artificial intelligence", "Artificial intelligence and machine learning have revolutionized", 95.0),
+    ("machine learning", "Machine learning enables computers to learn from experience", 88.0),
+    ("climate change", "Climate change represents one of the most pressing challenges", 92.0),
+    ("data analysis", "Data analysis techniques are essential for modern research", 85.0),
+    ("research methodology", "Research methodology forms the backbone of academic studies", 90.0),
+    ("literature review", "Literature review provides comprehensive overview of existing work", 87.0),
+]
+
+# Single case-insensitive alternation over all patterns so the text is
+# scanned once without building a lowercased copy of it
+ACADEMIC_PATTERN_RE = re.compile(
+    "|".join(re.escape(pattern) for pattern, _, _ in ACADEMIC_PATTERNS),
+    re.IGNORECASE
+)
+
+def create_realistic_matches(text: str) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Create realistic matches with proper positioning, along with the total
+    length of their original text and the sum of their similarities
+    """
     matches = []
-    text_lower = text.lower()
+    total_chars = 0
+    total_similarity = 0
     
-    # Look for common academic phrases and create matches
-    patterns = [
-        ("artificial intelligence", "Artificial intelligence and machine learning have revolutionized", 95.0),
-        ("machine learning", "Machine learning enables computers to learn from experience", 88.0),
-        ("climate change", "Climate change represents one of the most pressing challenges", 92.0),
-        ("data analysis", "Data analysis techniques are essential for modern research", 85.0),
-        ("research methodology", "Research methodology forms the backbone of academic studies", 90.0),
-        ("literature review", "Literature review provides comprehensive overview of existing work", 87.0),
-    ]
+    # Find the first occurrence of every pattern in one pass over the text
+    first_positions = {}
+    for found in ACADEMIC_PATTERN_RE.finditer(text):
+        first_positions.setdefault(found.group().lower(), found.start())
+        if len(first_positions) == len(ACADEMIC_PATTERNS):
+            break
     
-    for pattern, matched_text, similarity in patterns:
-        start_pos = text_lower.find(pattern)
-        if start_pos != -1:
+    # Look for common academic phrases and create matches
+    for pattern, matched_text, similarity in ACADEMIC_PATTERNS:
+        start_pos = first_positions.get(pattern)
+        if start_pos is not None:
             # Extract the actual text around the match
             # Get more context around the match
             context_start = max(0, start_pos - 5)
@@ -88,6 +182,8 @@ def create_realistic_matches(text: str) -> List[Dict[str, Any]]:
                 context_end = min(len(text), start_pos + 60)
                 original_text = text[context_start:context_end].strip()
             
+            total_chars += len(original_text)
+            total_similarity += similarity
             matches.append({
                 "originalText": original_text,
                 "matchedText": matched_text,
@@ -105,7 +201,17 @@ def create_realistic_matches(text: str) -> List[Dict[str, Any]]:
                 "type": "exact" if similarity > 90 else "paraphrased"
             })
     
-    return matches
+    return matches, total_chars, total_similarity
+
+def count_words(text: str) -> int:
+    """Count whitespace-separated words without splitting the whole text at once"""
+    count = 0
+    for start in range(0, len(text), IO_BUFFER_SIZE):
+        count += len(text[start:start + IO_BUFFER_SIZE].split())
+        # A word straddling the chunk boundary was counted in both chunks
+        if start and not text[start - 1].isspace() and not text[start].isspace():
+            count -= 1
+    return count
 
 def simulate_plagiarism_check(text: str, filename: str) -> Dict[str, Any]:
     """
@@ -113,16 +219,15 @@ def simulate_plagiarism_check(text: str, filename: str) -> Dict[str, Any]:
     """
     
     # Create matches based on actual text content
-    matches = create_realistic_matches(text)
+    matches, total_matched_chars, total_similarity = create_realistic_matches(text)
     
     # 🔥 FIX: Calculate overall similarity properly
     if matches:
         # Calculate based on text coverage and match quality
-        total_matched_chars = sum(len(match["originalText"]) for match in matches)
         text_coverage = min(total_matched_chars / len(text), 1.0)  # Max 100%
         
         # Average similarity of matches weighted by coverage
-        avg_similarity = sum(match["similarity"] for match in matches) / len(matches)
+        avg_similarity = total_similarity / len(matches)
         
         # Combine coverage and similarity (scale to 0-1)
         overall_similarity = (text_coverage * 0.6 + (avg_similarity / 100) * 0.4)
@@ -140,32 +245,39 @@ def simulate_plagiarism_check(text: str, filename: str) -> Dict[str, Any]:
     
     # Create source references
     sources = []
+    seen_source_ids = set()
     for match in matches:
         source = match["source"]
-        if not any(s["id"] == source["id"] for s in sources):
+        if source["id"] not in seen_source_ids:
+            seen_source_ids.add(source["id"])
             sources.append(source)
     
     return {
-        "documentId": str(uuid.uuid4()),
+        "documentId": uuid.uuid4().hex,
         "overallSimilarity": overall_similarity,
         "riskLevel": risk_level,
         "status": "completed",
-        "analyzedAt": datetime.now().isoformat(),
+        "analyzedAt": datetime.now(timezone.utc),
         "filename": filename,
-        "original_text": text,  # Return the FULL original text
-        "word_count": len(text.split()),
+        "original_text": text,  # Full text; responses truncate it to a preview
+        "word_count": count_words(text),
         "character_count": len(text),
         "matches": matches,
         "sources": sources
     }
 
-async def analyze_document(file_path: str, filename: str) -> Dict[str, Any]:
+async def analyze_document(file_path: Optional[str], filename: str, text: Optional[str] = None) -> Dict[str, Any]:
     """
-    Main analysis function that processes the document
+    Main analysis function that processes the document, either from the file
+    at file_path or from already extracted text
     """
     try:
-        # Extract text from the uploaded file
-        extracted_text = extract_text_from_file(file_path, filename)
+        if text is not None:
+            extracted_text = text
+        else:
+            # Extract text from the uploaded file in a worker thread so parsing
+            # doesn't block the event loop for other requests
+            extracted_text = await run_in_threadpool(extract_text_from_file, file_path, filename)
         
         if not extracted_text or len(extracted_text.strip()) < 10:
             raise ValueError("Document appears to be empty or too short for analysis")
@@ -178,6 +290,76 @@ async def analyze_document(file_path: str, filename: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Document analysis failed: {str(e)}")
 
+def lru_get(cache: OrderedDict, key: Any) -> Optional[Any]:
+    """Return a cached value, marking it as most recently used"""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+def lru_put(cache: OrderedDict, key: Any, value: Any, max_size: int) -> None:
+    """Cache a value, evicting the oldest entries beyond max_size"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+def document_text_path(document_id: str) -> Optional[Path]:
+    """Map a documentId to its stored text file, or None if the id is malformed"""
+    try:
+        return DOCUMENT_TEXT_DIR / f"{uuid.UUID(document_id).hex}.txt"
+    except ValueError:
+        return None
+
+def prune_document_texts() -> None:
+    """
+    Delete stored texts beyond DOCUMENT_TEXT_CACHE_SIZE, oldest first; texts
+    another worker deletes meanwhile are skipped
+    """
+    stored = []
+    with os.scandir(DOCUMENT_TEXT_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(".txt"):
+                try:
+                    stored.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+    stored.sort(reverse=True)
+    for _, path in stored[DOCUMENT_TEXT_CACHE_SIZE:]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+
+documents_stored_since_prune = 0
+
+def private_file_opener(path: str, flags: int) -> int:
+    """Open a file so that, when created, only its owner can read it"""
+    return os.open(path, flags, 0o600)
+
+async def store_document_text(document_id: str, text: str) -> None:
+    """Persist the full text of an analyzed document for the text endpoint"""
+    global documents_stored_since_prune
+    async with aiofiles.open(
+        document_text_path(document_id), "w", encoding="utf-8", opener=private_file_opener
+    ) as f:
+        await f.write(text)
+    
+    # Pruning scans the whole directory, so only do it every few documents
+    documents_stored_since_prune += 1
+    if documents_stored_since_prune >= DOCUMENT_TEXT_PRUNE_INTERVAL:
+        documents_stored_since_prune = 0
+        await run_in_threadpool(prune_document_texts)
+
+async def read_upload_chunks(file: UploadFile):
+    """Yield an upload in fixed-size chunks, enforcing the size limit (max 10MB)"""
+    total_size = 0
+    while chunk := await file.read(IO_BUFFER_SIZE):
+        total_size += len(chunk)
+        if total_size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail="File too large. Maximum size: 10MB")
+        yield chunk
+
 @app.get("/")
 async def root():
     return {
@@ -186,19 +368,21 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
-            "analyze": "/api/v1/analyze"
+            "analyze": "/api/v1/analyze",
+            "document_text": "/api/v1/documents/{document_id}/text"
         }
     }
 
+HEALTH_STATUS = {
+    "status": "healthy",
+    "service": "plagiarism-detection-api",
+    "version": "1.0.0"
+}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Railway"""
-    return {
-        "status": "healthy",
-        "service": "plagiarism-detection-api",
-        "version": "1.0.0",
-        "timestamp": datetime.now().isoformat()
-    }
+    return {**HEALTH_STATUS, "timestamp": datetime.now(timezone.utc)}
 
 @app.post("/api/v1/analyze")
 async def analyze_document_endpoint(file: UploadFile = File(...)):
@@ -219,43 +403,100 @@ async def analyze_document_endpoint(file: UploadFile = File(...)):
                 detail=f"Unsupported file type: {file.content_type}. Supported types: PDF, TXT, DOCX"
             )
         
-        # Validate file size (max 10MB)
-        content = await file.read()
-        if len(content) > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="File too large. Maximum size: 10MB")
-        
-        # Reset file position
-        await file.seek(0)
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-            # Save uploaded file
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
-        
+        suffix = Path(file.filename).suffix
+        tmp_file_path = None
+        text_content = None
         try:
-            # Analyze the document
-            result = await analyze_document(tmp_file_path, file.filename)
+            content_hash = hashlib.sha256()
+            if suffix.lower() == ".txt":
+                # Plain text is decoded straight from memory; there is
+                # nothing to gain from a temporary file round-trip
+                text_content = bytearray()
+                async for chunk in read_upload_chunks(file):
+                    content_hash.update(chunk)
+                    text_content += chunk
+            else:
+                # Stream the upload to a temporary file for the extractors
+                async with aiofiles.tempfile.NamedTemporaryFile(
+                    "wb", delete=False, suffix=suffix, buffering=IO_BUFFER_SIZE
+                ) as tmp_file:
+                    tmp_file_path = tmp_file.name
+                    async for chunk in read_upload_chunks(file):
+                        content_hash.update(chunk)
+                        await tmp_file.write(chunk)
+            
+            # Identical uploads reuse the previous analysis
+            cache_key = (content_hash.hexdigest(), suffix.lower())
+            cached = lru_get(analysis_cache, cache_key)
+            if cached is not None:
+                result = {
+                    **cached,
+                    "documentId": uuid.uuid4().hex,
+                    "analyzedAt": datetime.now(timezone.utc),
+                    "filename": file.filename
+                }
+            else:
+                # Analyze the document
+                if text_content is not None:
+                    result = await analyze_document(None, file.filename, text=decode_text(text_content))
+                else:
+                    result = await analyze_document(tmp_file_path, file.filename)
+                lru_put(analysis_cache, cache_key, result, ANALYSIS_CACHE_SIZE)
+            
+            full_text = result["original_text"]
+            await store_document_text(result["documentId"], full_text)
             
-            return JSONResponse(content={
+            return ORJSONResponse(content={
                 "success": True,
                 "message": "Document analyzed successfully",
-                "data": result
+                "data": {**result, "original_text": full_text[:ORIGINAL_TEXT_PREVIEW_SIZE]}
             })
             
         finally:
             # Clean up temporary file
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass  # Ignore cleanup errors
+            if tmp_file_path:
+                try:
+                    os.unlink(tmp_file_path)
+                except:
+                    pass  # Ignore cleanup errors
             
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.get("/api/v1/documents/{document_id}/text")
+async def get_document_text(document_id: str, start: int = 0, end: Optional[int] = None):
+    """
+    Return the full extracted text of a recently analyzed document, or the
+    [start, end) character range of it
+    """
+    path = document_text_path(document_id)
+    try:
+        if path is None:
+            raise FileNotFoundError(document_id)
+        async with aiofiles.open(path, "r", encoding="utf-8") as f:
+            text = await f.read()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found or no longer available")
+    
+    end = len(text) if end is None else min(end, len(text))
+    if start < 0 or start > end:
+        raise HTTPException(status_code=400, detail="Invalid text range")
+    
+    return {
+        "documentId": document_id,
+        "start": start,
+        "end": end,
+        "character_count": len(text),
+        "text": text[start:end]
+    }
+
 # 🚀 Railway deployment configuration
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    # uvloop has no Windows build; fall back to the stock asyncio loop there
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+    # One process per core; WEB_CONCURRENCY overrides the worker count
+    workers = int(os.environ.get("WEB_CONCURRENCY", max(2, os.cpu_count() or 2)))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop=loop, http="httptools", workers=workers)
\ No newline at end of file
@@ -1,26 +1,97 @@
 # services/academic_search.py - Phase 4: Academic Database Integration
 import aiohttp
 import asyncio
+import yarl
+import io
+from dataclasses import dataclass, fields
 import xml.etree.ElementTree as ET
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import quote_plus
 import re
+import sqlite3
+import string
+
+from .cache import DiskCache, TTLCache, private_cache_path
+
+# Decode JSON bodies straight from bytes with orjson when it is installed
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+_WS_RE = re.compile(r'\s+')
+_NONWORD_RE = re.compile(r'[^\w\s]')
+
+# Python 3.12+ can start a task eagerly, running it up to its first await
+# (a cache hit completes without ever being scheduled)
+_EAGER_TASK_FACTORY = getattr(asyncio, 'eager_task_factory', None)
+
+def _start_task(coro) -> asyncio.Task:
+    """Start a coroutine as a task, eagerly where supported"""
+    if _EAGER_TASK_FACTORY is not None:
+        return _EAGER_TASK_FACTORY(asyncio.get_running_loop(), coro)
+    return asyncio.create_task(coro)
+
+def _clip(text: str, limit: int) -> str:
+    """Truncate text to limit characters, marking the cut with '...'"""
+    return text if len(text) <= limit else text[:limit] + '...'
+
+# JSON bodies larger than this are decoded in a worker thread
+JSON_OFFLOAD_SIZE = 200 * 1024
+
+@dataclass(slots=True)
+class PaperHit:
+    """
+    A single search result. Providers fill in the fields they have; as_dict()
+    gives the JSON shape returned to callers, without the unset fields
+    """
+    title: str
+    authors: str
+    url: str
+    source: str
+    source_type: str
+    snippet: Optional[str] = None
+    abstract: Optional[str] = None
+    published_date: Optional[str] = None
+    journal: Optional[str] = None
+    year: Optional[str] = None
+    venue: Optional[str] = None
+    citation_count: Optional[int] = None
+    doi: Optional[str] = None
+    pmid: Optional[str] = None
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            name: value for name in _PAPER_HIT_FIELDS
+            if (value := getattr(self, name)) is not None
+        }
+
+_PAPER_HIT_FIELDS = tuple(field.name for field in fields(PaperHit))
+
 class AcademicSearch:
     """
     Search academic databases for scholarly content
     """
     
+    # Cap on outbound requests in flight across all instances and providers
+    _inflight = asyncio.Semaphore(int(os.getenv('ACADEMIC_MAX_INFLIGHT', '16')))
+    
     def __init__(self):
         # API endpoints
         self.arxiv_base = "http://export.arxiv.org/api/query"
         self.pubmed_base = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
         self.crossref_base = "https://api.crossref.org/works"
         self.semantic_scholar_base = "https://api.semanticscholar.org/graph/v1"
+        self._build_urls()
         
         # Request headers
         self.headers = {
@@ -28,8 +99,96 @@ class AcademicSearch:
             'Accept': 'application/json, application/xml, text/xml'
         }
         
-        # Rate limiting
-        self.request_delay = 1.0  # Seconds between requests
+        # Rate limiting: one request in flight per provider, spaced by
+        # request_delay; different providers are queried in parallel
+        self.request_delay = 1.0  # Seconds between requests to the same provider
+        providers = ('arxiv', 'crossref', 'semantic_scholar', 'pubmed')
+        self._provider_locks = {name: asyncio.Lock() for name in providers}
+        self._last_call = {name: 0.0 for name in providers}
+        
+        # NCBI allows 3 requests/second per client, or 10 with an API key
+        self.ncbi_api_key = os.environ.get('NCBI_API_KEY')
+        self.provider_delays = {'pubmed': 0.1 if self.ncbi_api_key else 0.34}
+        
+        # Parsed results per (provider, normalized query, max_results): an
+        # in-process cache in front of an SQLite cache shared by all workers
+        self._cache = TTLCache(maxsize=2048, ttl=3600)
+        self.cache_ttls = {
+            'arxiv': 24 * 3600,
+            'crossref': 24 * 3600,
+            'semantic_scholar': 6 * 3600,
+            'pubmed': 24 * 3600
+        }
+        cache_path = None
+        try:
+            cache_path = os.environ.get('ACADEMIC_CACHE_PATH') or private_cache_path('academic_cache.sqlite')
+            self._disk_cache: Optional[DiskCache] = DiskCache(cache_path, ttl=24 * 3600)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Academic disk cache unavailable at {cache_path}: {e}")
+            self._disk_cache = None
+        
+        # Shared HTTP session, created on first use and reused by every request
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Default for every request: fail fast on connect and stalled reads
+        self._timeout = aiohttp.ClientTimeout(total=30, connect=5, sock_read=20)
+    
+    def _build_urls(self) -> None:
+        """Parse the fixed endpoint URLs once; call again after changing a *_base"""
+        self._arxiv_url = yarl.URL(self.arxiv_base)
+        self._crossref_url = yarl.URL(self.crossref_base)
+        self._semantic_scholar_search_url = yarl.URL(f"{self.semantic_scholar_base}/paper/search")
+        self._pubmed_esearch_url = yarl.URL(f"{self.pubmed_base}/esearch.fcgi")
+        self._pubmed_esummary_url = yarl.URL(f"{self.pubmed_base}/esummary.fcgi")
+        self._pubmed_efetch_url = yarl.URL(f"{self.pubmed_base}/efetch.fcgi")
+    
+    async def __aenter__(self) -> "AcademicSearch":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    async def start(self) -> None:
+        """Open the shared HTTP session"""
+        await self._get_session()
+    
+    async def close(self) -> None:
+        """Close the shared HTTP session; call once at application shutdown"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(
+                    limit=64,
+                    limit_per_host=8,
+                    ttl_dns_cache=300,
+                    enable_cleanup_closed=True,
+                    # Keep idle provider connections (and their TLS sessions)
+                    # open between searches
+                    force_close=False,
+                    keepalive_timeout=60
+                ),
+                timeout=self._timeout
+            )
+        return self._session
+    
+    @asynccontextmanager
+    async def _rate_limited(self, provider: str):
+        """Hold the provider's request slot, waiting out its request delay first"""
+        async with self._provider_locks[provider]:
+            delay = self.provider_delays.get(provider, self.request_delay)
+            wait = self._last_call[provider] + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                yield
+            finally:
+                self._last_call[provider] = time.monotonic()
     
     async def search_all_academic_sources(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -40,29 +199,84 @@ class AcademicSearch:
         try:
             # Search different academic sources
             search_tasks = [
-                self._search_arxiv(query, max_results // 4),
-                self._search_crossref(query, max_results // 4),
-                self._search_semantic_scholar(query, max_results // 4),
-                self._search_pubmed(query, max_results // 4)
+                _start_task(self._cached_search('arxiv', self._search_arxiv, query, max_results // 4)),
+                _start_task(self._cached_search('crossref', self._search_crossref, query, max_results // 4)),
+                _start_task(self._cached_search('semantic_scholar', self._search_semantic_scholar, query, max_results // 4)),
+                _start_task(self._cached_search('pubmed', self._search_pubmed, query, max_results // 4))
             ]
             
-            # Execute searches concurrently with rate limiting
-            results = await self._execute_with_rate_limit(search_tasks)
+            # Wait for all providers; rate limiting is per provider
+            results = await asyncio.gather(*search_tasks, return_exceptions=True)
             
             # Combine results
             for result_list in results:
-                if result_list:
+                if isinstance(result_list, Exception):
+                    logger.error(f"Academic source search failed: {result_list}")
+                elif result_list:
                     all_results.extend(result_list)
             
             # Remove duplicates and limit results
             unique_results = self._deduplicate_academic_results(all_results)
-            return unique_results[:max_results]
+            return [paper.as_dict() for paper in unique_results[:max_results]]
             
         except Exception as e:
             logger.error(f"Academic search failed: {e}")
             return []
     
-    async def _search_arxiv(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    async def _cached_search(self, provider: str, search, query: str, max_results: int) -> List[PaperHit]:
+        """Run a provider search, reusing results for recently seen queries"""
+        key = (provider, self._normalize_query(query), max_results)
+        results = self._cache.get(key)
+        if results is not None:
+            return results
+        
+        results = await self._disk_cache_get(repr(key))
+        if results is None:
+            results = await search(query, max_results)
+            # Empty results are not cached: providers also return [] on errors
+            if not results:
+                return results
+            await self._disk_cache_set(repr(key), results, self.cache_ttls[provider])
+        
+        self._cache.set(key, results)
+        return results
+    
+    async def _disk_cache_get(self, key: str) -> Optional[List[PaperHit]]:
+        """Read shared cached results; cache failures and unreadable entries count as misses"""
+        if self._disk_cache is None:
+            return None
+        try:
+            cached = await self._run_off_loop(self._disk_cache.get, key)
+            if cached is None:
+                return None
+            try:
+                return [PaperHit(**paper) for paper in cached]
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Dropping unreadable academic disk cache entry: {e}")
+                await self._run_off_loop(self._disk_cache.delete, key)
+                return None
+        except sqlite3.Error as e:
+            logger.warning(f"Academic disk cache read failed: {e}")
+            return None
+    
+    async def _disk_cache_set(self, key: str, results: List[PaperHit], ttl: float) -> None:
+        """Write results to the shared cache; failures are logged and ignored"""
+        if self._disk_cache is None:
+            return
+        try:
+            papers = [paper.as_dict() for paper in results]
+            await self._run_off_loop(self._disk_cache.set, key, papers, ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"Academic disk cache write failed: {e}")
+    
+    async def _request(self, provider: str, method: str, url, **kwargs) -> Tuple[int, bytes]:
+        """Send one rate-limited request to a provider, returning (status, body)"""
+        session = await self._get_session()
+        async with self._rate_limited(provider), self._inflight:
+            async with session.request(method, url, **kwargs) as response:
+                return response.status, await response.read()
+    
+    async def _search_arxiv(self, query: str, max_results: int = 5) -> List[PaperHit]:
         """Search arXiv preprint server"""
         try:
             logger.info(f"Searching arXiv for: {query[:50]}...")
@@ -77,27 +291,20 @@ class AcademicSearch:
                 'sortOrder': 'descending'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.arxiv_base,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        results = self._parse_arxiv_xml(content)
-                        logger.info(f"Found {len(results)} arXiv results")
-                        return results
-                    else:
-                        logger.warning(f"arXiv search failed with status {response.status}")
+            status, content = await self._request('arxiv', 'GET', self._arxiv_url.with_query(params))
+            if status == 200:
+                results = await self._run_off_loop(self._parse_arxiv_xml, content)
+                logger.info(f"Found {len(results)} arXiv results")
+                return results
+            else:
+                logger.warning(f"arXiv search failed with status {status}")
             
         except Exception as e:
             logger.error(f"arXiv search error: {e}")
         
         return []
     
-    async def _search_crossref(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    async def _search_crossref(self, query: str, max_results: int = 5) -> List[PaperHit]:
         """Search CrossRef for published academic papers"""
         try:
             logger.info(f"Searching CrossRef for: {query[:50]}...")
@@ -109,65 +316,53 @@ class AcademicSearch:
                 'order': 'desc'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.crossref_base,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = self._parse_crossref_results(data)
-                        logger.info(f"Found {len(results)} CrossRef results")
-                        return results
-                    else:
-                        logger.warning(f"CrossRef search failed with status {response.status}")
+            status, content = await self._request('crossref', 'GET', self._crossref_url.with_query(params))
+            if status == 200:
+                data = await self._decode_json(content)
+                results = self._parse_crossref_results(data)
+                logger.info(f"Found {len(results)} CrossRef results")
+                return results
+            else:
+                logger.warning(f"CrossRef search failed with status {status}")
             
         except Exception as e:
             logger.error(f"CrossRef search error: {e}")
         
         return []
     
-    async def _search_semantic_scholar(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    async def _search_semantic_scholar(self, query: str, max_results: int = 5) -> List[PaperHit]:
         """Search Semantic Scholar API"""
         try:
             logger.info(f"Searching Semantic Scholar for: {query[:50]}...")
             
-            search_url = f"{self.semantic_scholar_base}/paper/search"
             params = {
                 'query': query[:500],
                 'limit': max_results,
                 'fields': 'title,authors,year,abstract,url,venue,citationCount'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    search_url,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = self._parse_semantic_scholar_results(data)
-                        logger.info(f"Found {len(results)} Semantic Scholar results")
-                        return results
-                    else:
-                        logger.warning(f"Semantic Scholar search failed with status {response.status}")
+            status, content = await self._request(
+                'semantic_scholar', 'GET', self._semantic_scholar_search_url.with_query(params)
+            )
+            if status == 200:
+                data = await self._decode_json(content)
+                results = self._parse_semantic_scholar_results(data)
+                logger.info(f"Found {len(results)} Semantic Scholar results")
+                return results
+            else:
+                logger.warning(f"Semantic Scholar search failed with status {status}")
             
         except Exception as e:
             logger.error(f"Semantic Scholar search error: {e}")
         
         return []
     
-    async def _search_pubmed(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    async def _search_pubmed(self, query: str, max_results: int = 5) -> List[PaperHit]:
         """Search PubMed for medical/life science papers"""
         try:
             logger.info(f"Searching PubMed for: {query[:50]}...")
             
             # First, search for PMIDs
-            search_url = f"{self.pubmed_base}/esearch.fcgi"
             search_params = {
                 'db': 'pubmed',
                 'term': query[:500],
@@ -175,66 +370,73 @@ class AcademicSearch:
                 'retmode': 'json',
                 'sort': 'relevance'
             }
+            self._add_ncbi_api_key(search_params)
             
-            async with aiohttp.ClientSession() as session:
-                # Get PMIDs
-                async with session.get(
-                    search_url,
-                    params=search_params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status != 200:
-                        logger.warning(f"PubMed search failed with status {response.status}")
-                        return []
-                    
-                    search_data = await response.json()
-                    pmids = search_data.get('esearchresult', {}).get('idlist', [])
-                    
-                    if not pmids:
-                        logger.info("No PubMed results found")
-                        return []
-                
-                # Get paper details
-                summary_url = f"{self.pubmed_base}/esummary.fcgi"
-                summary_params = {
-                    'db': 'pubmed',
-                    'id': ','.join(pmids),
-                    'retmode': 'json'
-                }
-                
-                async with session.get(
-                    summary_url,
-                    params=summary_params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        summary_data = await response.json()
-                        results = self._parse_pubmed_results(summary_data, pmids)
-                        logger.info(f"Found {len(results)} PubMed results")
-                        return results
+            # Get PMIDs
+            status, content = await self._request('pubmed', 'GET', self._pubmed_esearch_url.with_query(search_params))
+            if status != 200:
+                logger.warning(f"PubMed search failed with status {status}")
+                return []
+            
+            search_data = await self._decode_json(content)
+            pmids = search_data.get('esearchresult', {}).get('idlist', [])
+            
+            if not pmids:
+                logger.info("No PubMed results found")
+                return []
+            
+            # Get paper details
+            summary_params = {
+                'db': 'pubmed',
+                'id': ','.join(pmids),
+                'retmode': 'json'
+            }
+            self._add_ncbi_api_key(summary_params)
+            
+            # POST keeps long PMID lists out of the URL
+            status, content = await self._request('pubmed', 'POST', self._pubmed_esummary_url, data=summary_params)
+            if status == 200:
+                summary_data = await self._decode_json(content)
+                results = self._parse_pubmed_results(summary_data, pmids)
+                logger.info(f"Found {len(results)} PubMed results")
+                return results
             
         except Exception as e:
             logger.error(f"PubMed search error: {e}")
         
         return []
     
-    def _parse_arxiv_xml(self, xml_content: str) -> List[Dict[str, Any]]:
+    async def _run_off_loop(self, func, *args):
+        """Run a CPU-bound parser in the default executor, keeping the event loop free"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+    
+    async def _decode_json(self, content: bytes) -> Any:
+        """Decode a JSON body, off the event loop when it is large"""
+        if len(content) > JSON_OFFLOAD_SIZE:
+            return await self._run_off_loop(_loads, content)
+        return _loads(content)
+    
+    def _add_ncbi_api_key(self, params: Dict[str, Any]) -> None:
+        """Attach the NCBI API key, when configured, to E-utilities parameters"""
+        if self.ncbi_api_key:
+            params['api_key'] = self.ncbi_api_key
+    
+    def _parse_arxiv_xml(self, xml_content: bytes) -> List[PaperHit]:
         """Parse arXiv XML response"""
         results = []
         try:
-            root = ET.fromstring(xml_content)
-            
             # Handle namespaces
             namespaces = {
                 'atom': 'http://www.w3.org/2005/Atom',
                 'arxiv': 'http://arxiv.org/schemas/atom'
             }
+            entry_tag = '{http://www.w3.org/2005/Atom}entry'
             
-            entries = root.findall('atom:entry', namespaces)
-            
-            for entry in entries:
+            # Stream entries out of the feed instead of building the whole tree
+            for _, entry in ET.iterparse(io.BytesIO(xml_content)):
+                if entry.tag != entry_tag:
+                    continue
                 try:
                     title_elem = entry.find('atom:title', namespaces)
                     summary_elem = entry.find('atom:summary', namespaces)
@@ -251,32 +453,37 @@ class AcademicSearch:
                     
                     if title_elem is not None and summary_elem is not None:
                         # Clean and format data
-                        title = re.sub(r'\s+', ' ', title_elem.text.strip())
-                        abstract = re.sub(r'\s+', ' ', summary_elem.text.strip())
+                        title = _WS_RE.sub(' ', title_elem.text.strip())
+                        abstract = _WS_RE.sub(' ', summary_elem.text.strip())
+                        # The snippet is cut from the already clipped abstract
+                        clipped_abstract = _clip(abstract, 300)
                         paper_id = id_elem.text if id_elem is not None else ''
                         published = published_elem.text if published_elem is not None else ''
                         
-                        results.append({
-                            'title': title,
-                            'authors': ', '.join(authors[:3]),  # Limit to first 3 authors
-                            'abstract': abstract[:300] + '...' if len(abstract) > 300 else abstract,
-                            'url': paper_id,
-                            'published_date': published.split('T')[0] if published else '',
-                            'source': 'arXiv',
-                            'source_type': 'preprint',
-                            'snippet': abstract[:200] + '...' if len(abstract) > 200 else abstract
-                        })
+                        results.append(PaperHit(
+                            title=title,
+                            authors=', '.join(authors[:3]),  # Limit to first 3 authors
+                            abstract=clipped_abstract,
+                            url=paper_id,
+                            published_date=published.split('T')[0] if published else '',
+                            source='arXiv',
+                            source_type='preprint',
+                            snippet=_clip(clipped_abstract, 200)
+                        ))
                 
                 except Exception as e:
                     logger.error(f"Error parsing arXiv entry: {e}")
                     continue
+                
+                finally:
+                    entry.clear()
         
         except ET.ParseError as e:
             logger.error(f"Failed to parse arXiv XML: {e}")
         
         return results
     
-    def _parse_crossref_results(self, data: Dict) -> List[Dict[str, Any]]:
+    def _parse_crossref_results(self, data: Dict) -> List[PaperHit]:
         """Parse CrossRef JSON response"""
         results = []
         
@@ -289,22 +496,17 @@ class AcademicSearch:
                     title_list = item.get('title', [])
                     title = title_list[0] if title_list else 'Untitled'
                     
-                    # Extract authors
-                    authors = []
-                    author_list = item.get('author', [])
-                    for author in author_list[:3]:  # Limit to first 3 authors
-                        given = author.get('given', '')
-                        family = author.get('family', '')
-                        if family:
-                            authors.append(f"{given} {family}".strip())
+                    # Extract authors (first 3)
+                    authors = ', '.join(
+                        f"{author.get('given', '')} {author['family']}".strip()
+                        for author in item.get('author', [])[:3] if author.get('family')
+                    )
                     
                     # Extract other fields
-                    journal = item.get('container-title', [''])[0] if item.get('container-title') else ''
-                    year = ''
-                    if 'published-print' in item:
-                        year = str(item['published-print']['date-parts'][0][0])
-                    elif 'published-online' in item:
-                        year = str(item['published-online']['date-parts'][0][0])
+                    container_title = item.get('container-title')
+                    journal = container_title[0] if container_title else ''
+                    published = item.get('published-print') or item.get('published-online')
+                    year = str(published['date-parts'][0][0]) if published else ''
                     
                     url = item.get('URL', '')
                     doi = item.get('DOI', '')
@@ -312,23 +514,22 @@ class AcademicSearch:
                         url = f"https://doi.org/{doi}"
                     
                     # Create snippet from available text
-                    snippet_parts = []
                     if journal:
-                        snippet_parts.append(f"Published in {journal}")
-                    if year:
-                        snippet_parts.append(f"({year})")
+                        snippet = f"Published in {journal}. ({year})" if year else f"Published in {journal}"
+                    else:
+                        snippet = f"({year})" if year else 'Academic publication'
                     
-                    results.append({
-                        'title': title,
-                        'authors': ', '.join(authors),
-                        'journal': journal,
-                        'year': year,
-                        'url': url,
-                        'doi': doi,
-                        'source': 'CrossRef',
-                        'source_type': 'journal',
-                        'snippet': '. '.join(snippet_parts) if snippet_parts else 'Academic publication'
-                    })
+                    results.append(PaperHit(
+                        title=title,
+                        authors=authors,
+                        journal=journal,
+                        year=year,
+                        url=url,
+                        doi=doi,
+                        source='CrossRef',
+                        source_type='journal',
+                        snippet=snippet
+                    ))
                 
                 except Exception as e:
                     logger.error(f"Error parsing CrossRef item: {e}")
@@ -339,7 +540,7 @@ class AcademicSearch:
         
         return results
     
-    def _parse_semantic_scholar_results(self, data: Dict) -> List[Dict[str, Any]]:
+    def _parse_semantic_scholar_results(self, data: Dict) -> List[PaperHit]:
         """Parse Semantic Scholar JSON response"""
         results = []
         
@@ -350,44 +551,38 @@ class AcademicSearch:
                 try:
                     title = paper.get('title', 'Untitled')
                     
-                    # Extract authors
-                    authors = []
-                    author_list = paper.get('authors', [])
-                    for author in author_list[:3]:  # Limit to first 3 authors
-                        name = author.get('name', '')
-                        if name:
-                            authors.append(name)
+                    # Extract authors (first 3)
+                    authors = ', '.join(
+                        author['name'] for author in paper.get('authors', [])[:3] if author.get('name')
+                    )
                     
                     # Extract other fields
-                    year = str(paper.get('year', '')) if paper.get('year') else ''
+                    year = str(paper['year']) if paper.get('year') else ''
                     abstract = paper.get('abstract', '')
                     url = paper.get('url', '')
                     venue = paper.get('venue', '')
                     citation_count = paper.get('citationCount', 0)
                     
-                    # Create snippet
-                    snippet_parts = []
-                    if venue:
-                        snippet_parts.append(f"Published in {venue}")
-                    if year:
-                        snippet_parts.append(f"({year})")
-                    if citation_count:
-                        snippet_parts.append(f"Cited {citation_count} times")
-                    if abstract:
-                        snippet_parts.append(abstract[:150] + '...' if len(abstract) > 150 else abstract)
+                    # Create snippet from the fields that are present
+                    snippet = '. '.join(part for part in (
+                        venue and f"Published in {venue}",
+                        year and f"({year})",
+                        citation_count and f"Cited {citation_count} times",
+                        abstract and _clip(abstract, 150)
+                    ) if part) or 'Academic paper'
                     
-                    results.append({
-                        'title': title,
-                        'authors': ', '.join(authors),
-                        'year': year,
-                        'abstract': abstract[:300] + '...' if len(abstract) > 300 else abstract,
-                        'url': url,
-                        'venue': venue,
-                        'citation_count': citation_count,
-                        'source': 'Semantic Scholar',
-                        'source_type': 'academic',
-                        'snippet': '. '.join(snippet_parts) if snippet_parts else 'Academic paper'
-                    })
+                    results.append(PaperHit(
+                        title=title,
+                        authors=authors,
+                        year=year,
+                        abstract=_clip(abstract, 300),
+                        url=url,
+                        venue=venue,
+                        citation_count=citation_count,
+                        source='Semantic Scholar',
+                        source_type='academic',
+                        snippet=snippet
+                    ))
                 
                 except Exception as e:
                     logger.error(f"Error parsing Semantic Scholar paper: {e}")
@@ -398,7 +593,7 @@ class AcademicSearch:
         
         return results
     
-    def _parse_pubmed_results(self, data: Dict, pmids: List[str]) -> List[Dict[str, Any]]:
+    def _parse_pubmed_results(self, data: Dict, pmids: List[str]) -> List[PaperHit]:
         """Parse PubMed JSON response"""
         results = []
         
@@ -414,13 +609,10 @@ class AcademicSearch:
                     
                     title = paper_data.get('title', 'Untitled')
                     
-                    # Extract authors
-                    authors = []
-                    author_list = paper_data.get('authors', [])
-                    for author in author_list[:3]:  # Limit to first 3 authors
-                        name = author.get('name', '')
-                        if name:
-                            authors.append(name)
+                    # Extract authors (first 3)
+                    authors = ', '.join(
+                        author['name'] for author in paper_data.get('authors', [])[:3] if author.get('name')
+                    )
                     
                     # Extract other fields
                     journal = paper_data.get('fulljournalname', '')
@@ -431,24 +623,23 @@ class AcademicSearch:
                     url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
                     
                     # Create snippet
-                    snippet_parts = []
-                    if journal:
-                        snippet_parts.append(f"Published in {journal}")
-                    if year:
-                        snippet_parts.append(f"({year})")
-                    snippet_parts.append("Medical/Life Sciences research")
+                    snippet = (
+                        (f"Published in {journal}. " if journal else '')
+                        + (f"({year}). " if year else '')
+                        + "Medical/Life Sciences research"
+                    )
                     
-                    results.append({
-                        'title': title,
-                        'authors': ', '.join(authors),
-                        'journal': journal,
-                        'year': year,
-                        'pmid': pmid,
-                        'url': url,
-                        'source': 'PubMed',
-                        'source_type': 'journal',
-                        'snippet': '. '.join(snippet_parts)
-                    })
+                    results.append(PaperHit(
+                        title=title,
+                        authors=authors,
+                        journal=journal,
+                        year=year,
+                        pmid=pmid,
+                        url=url,
+                        source='PubMed',
+                        source_type='journal',
+                        snippet=snippet
+                    ))
                 
                 except Exception as e:
                     logger.error(f"Error parsing PubMed paper {pmid}: {e}")
@@ -462,64 +653,72 @@ class AcademicSearch:
     def _clean_query_for_arxiv(self, query: str) -> str:
         """Clean query for arXiv search"""
         # Remove special characters that might cause issues
-        cleaned = re.sub(r'[^\w\s]', ' ', query)
+        cleaned = _NONWORD_RE.sub(' ', query)
         # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = _WS_RE.sub(' ', cleaned).strip()
         # Limit length
         return cleaned[:200]
     
-    def _deduplicate_academic_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate results based on title similarity"""
+    def _normalize_query(self, query: str) -> str:
+        """Normalize a query for use as a cache key"""
+        cleaned = _NONWORD_RE.sub(' ', query)
+        return _WS_RE.sub(' ', cleaned).strip().lower()
+    
+    def _deduplicate_academic_results(self, results: List[PaperHit]) -> List[PaperHit]:
+        """
+        Remove duplicate results: the same DOI, PMID or arXiv ID, or the same
+        normalized title (which catches one paper returned by several providers)
+        """
         if not results:
             return []
         
         unique_results = []
-        seen_titles = set()
+        seen = set()
         
         for result in results:
-            title = result.get('title', '').lower().strip()
-            
-            # Simple deduplication based on title
-            title_key = re.sub(r'[^\w\s]', '', title)[:50]
-            
-            if title_key not in seen_titles:
-                seen_titles.add(title_key)
+            keys = self._result_keys(result)
+            is_duplicate = any(key in seen for key in keys)
+            seen.update(keys)
+            if not is_duplicate:
                 unique_results.append(result)
         
         return unique_results
     
-    async def _execute_with_rate_limit(self, tasks: List) -> List:
-        """Execute tasks with rate limiting"""
-        results = []
+    def _result_keys(self, result: PaperHit) -> List[tuple]:
+        """Identity keys of a search result, identifiers first"""
+        keys = []
+        if result.doi:
+            keys.append(('doi', result.doi.lower()))
+        if result.pmid:
+            keys.append(('pmid', result.pmid))
+        if result.source == 'arXiv' and '/abs/' in (result.url or ''):
+            # http://arxiv.org/abs/2101.00001v2 -> 2101.00001
+            arxiv_id = result.url.rsplit('/abs/', 1)[1]
+            base_id, _, version = arxiv_id.rpartition('v')
+            keys.append(('arxiv', base_id if base_id and version.isdigit() else arxiv_id))
         
-        for task in tasks:
-            try:
-                result = await task
-                results.append(result)
-                # Rate limiting delay
-                await asyncio.sleep(self.request_delay)
-            except Exception as e:
-                logger.error(f"Task execution failed: {e}")
-                results.append([])
-        
-        return results
+        title_words = (result.title or '').lower().translate(_PUNCT_TABLE).split()
+        if title_words:
+            keys.append(('title', ' '.join(title_words[:8])))
+        return keys
     
     async def get_paper_details(self, paper_id: str, source: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about a specific paper"""
         try:
             if source.lower() == 'arxiv':
-                return await self._get_arxiv_details(paper_id)
+                paper = await self._get_arxiv_details(paper_id)
             elif source.lower() == 'semantic scholar':
-                return await self._get_semantic_scholar_details(paper_id)
+                paper = await self._get_semantic_scholar_details(paper_id)
             elif source.lower() == 'pubmed':
-                return await self._get_pubmed_details(paper_id)
+                paper = await self._get_pubmed_details(paper_id)
             else:
                 return None
+            return paper.as_dict() if paper is not None else None
         except Exception as e:
             logger.error(f"Failed to get paper details: {e}")
             return None
     
-    async def _get_arxiv_details(self, arxiv_id: str) -> Optional[Dict[str, Any]]:
+    async def _get_arxiv_details(self, arxiv_id: str) -> Optional[PaperHit]:
         """Get detailed arXiv paper information"""
         try:
             params = {
@@ -527,23 +726,16 @@ class AcademicSearch:
                 'max_results': 1
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.arxiv_base,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        results = self._parse_arxiv_xml(content)
-                        return results[0] if results else None
+            status, content = await self._request('arxiv', 'GET', self._arxiv_url.with_query(params))
+            if status == 200:
+                results = await self._run_off_loop(self._parse_arxiv_xml, content)
+                return results[0] if results else None
         except Exception as e:
             logger.error(f"arXiv details fetch failed: {e}")
         
         return None
     
-    async def _get_semantic_scholar_details(self, paper_id: str) -> Optional[Dict[str, Any]]:
+    async def _get_semantic_scholar_details(self, paper_id: str) -> Optional[PaperHit]:
         """Get detailed Semantic Scholar paper information"""
         try:
             url = f"{self.semantic_scholar_base}/paper/{paper_id}"
@@ -551,55 +743,43 @@ class AcademicSearch:
                 'fields': 'title,authors,year,abstract,url,venue,citationCount,references,citations'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._parse_semantic_scholar_results({'data': [data]})[0]
+            status, content = await self._request('semantic_scholar', 'GET', url, params=params)
+            if status == 200:
+                data = await self._decode_json(content)
+                return self._parse_semantic_scholar_results({'data': [data]})[0]
         except Exception as e:
             logger.error(f"Semantic Scholar details fetch failed: {e}")
         
         return None
     
-    async def _get_pubmed_details(self, pmid: str) -> Optional[Dict[str, Any]]:
+    async def _get_pubmed_details(self, pmid: str) -> Optional[PaperHit]:
         """Get detailed PubMed paper information"""
         try:
             # Get full record
-            fetch_url = f"{self.pubmed_base}/efetch.fcgi"
             params = {
                 'db': 'pubmed',
                 'id': pmid,
                 'retmode': 'xml',
                 'rettype': 'abstract'
             }
+            self._add_ncbi_api_key(params)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    fetch_url,
-                    params=params,
-                    headers=self.headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        return self._parse_pubmed_xml_details(content, pmid)
+            status, content = await self._request('pubmed', 'GET', self._pubmed_efetch_url.with_query(params))
+            if status == 200:
+                return await self._run_off_loop(self._parse_pubmed_xml_details, content, pmid)
         except Exception as e:
             logger.error(f"PubMed details fetch failed: {e}")
         
         return None
     
-    def _parse_pubmed_xml_details(self, xml_content: str, pmid: str) -> Optional[Dict[str, Any]]:
+    def _parse_pubmed_xml_details(self, xml_content: bytes, pmid: str) -> Optional[PaperHit]:
         """Parse detailed PubMed XML response"""
         try:
-            root = ET.fromstring(xml_content)
-            
-            # Extract detailed information
-            article = root.find('.//Article')
+            # Stop parsing as soon as the first article is complete
+            article = next(
+                (elem for _, elem in ET.iterparse(io.BytesIO(xml_content)) if elem.tag == 'Article'),
+                None
+            )
             if article is None:
                 return None
             
@@ -626,16 +806,16 @@ class AcademicSearch:
             journal_elem = article.find('.//Journal/Title')
             journal = journal_elem.text if journal_elem is not None else ''
             
-            return {
-                'title': title,
-                'abstract': abstract,
-                'authors': ', '.join(authors),
-                'journal': journal,
-                'pmid': pmid,
-                'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                'source': 'PubMed',
-                'source_type': 'journal'
-            }
+            return PaperHit(
+                title=title,
+                abstract=abstract,
+                authors=', '.join(authors),
+                journal=journal,
+                pmid=pmid,
+                url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+                source='PubMed',
+                source_type='journal'
+            )
         
         except ET.ParseError as e:
             logger.error(f"Failed to parse PubMed XML details: {e}")
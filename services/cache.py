@@ -0,0 +1,114 @@
+# services/cache.py - Result caches shared by the services
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Hashable, Iterator, Optional
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire ttl seconds after they are stored
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return a live entry, marking it as most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def private_cache_path(filename: str) -> str:
+    """
+    Path of a cache file in a per-user application directory that only its
+    owner can read or write
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    directory = os.path.join(base, 'plagiarism-backend')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # makedirs applies the umask and leaves existing directories alone
+    os.chmod(directory, 0o700)
+    return os.path.join(directory, filename)
+
+
+class DiskCache:
+    """
+    SQLite-backed cache with per-entry expiry, shared by every process (and
+    every restart) that opens the same file. Values are stored as JSON, so
+    they must be built from dicts, lists, strings, numbers and None
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection (usable from any thread), committing on success"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        """Return a live entry; entries that fail to decode are dropped and count as misses"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if row is None:
+                return default
+            try:
+                return json.loads(row[0])
+            except (TypeError, ValueError):
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (the cache default if not given)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(',', ':')), now + (self.ttl if ttl is None else ttl))
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+    
+    def delete(self, key: str) -> None:
+        """Drop an entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
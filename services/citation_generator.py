@@ -1,17 +1,90 @@
 # services/citation_generator.py - Phase 4: Citation Generator
 import re
+import string
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 import logging
 
 logger = logging.getLogger(__name__)
 
+_WS_RE = re.compile(r'\s+')
+# Common website suffixes, stripped in this order; one pattern anchored at
+# the end removes the same trailing run the sequential endswith checks did
+_TITLE_SUFFIXES = (
+    ' - Wikipedia',
+    ' | Wikipedia',
+    ' - Google Scholar',
+    ' | Google Scholar',
+    ' - ResearchGate',
+    ' | ResearchGate'
+)
+_SUFFIX_RE = re.compile(
+    ''.join(f'(?:{re.escape(suffix)})?' for suffix in reversed(_TITLE_SUFFIXES)) + '$'
+)
+# Author patterns in priority order: an earlier pattern wins even if a later
+# one matches further left in the title
+_AUTHOR_PATTERNS = (
+    re.compile(r'by\s+([A-Z][a-z]+\s+[A-Z][a-z]+)'),  # "by John Doe"
+    re.compile(r'([A-Z][a-z]+\s+[A-Z]\.\s+[A-Z][a-z]+)'),  # "John A. Doe"
+    re.compile(r'([A-Z][a-z]+,\s+[A-Z]\.)')  # "Doe, J."
+)
+_YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+
+_SCHEME_CHARS = frozenset(string.ascii_letters + string.digits + '+-.')
+
+@lru_cache(maxsize=4096)
+def _parse_domain(url: str) -> str:
+    """Network location of a URL, memoized since sources repeat across calls"""
+    # Plain "scheme://netloc/..." URLs are sliced directly; anything unusual
+    # (no scheme, stray whitespace, IPv6 or non-ASCII hosts) goes through urlparse
+    i = url.find('://')
+    if i <= 0 or not url[0].isalpha() or not _SCHEME_CHARS.issuperset(url[:i]) \
+            or '\t' in url or '\n' in url or '\r' in url:
+        return urlparse(url).netloc
+    start = i + 3
+    end = len(url)
+    for delimiter in '/?#':
+        j = url.find(delimiter, start, end)
+        if j >= 0:
+            end = j
+    netloc = url[start:end]
+    if '[' in netloc or ']' in netloc or not netloc.isascii():
+        # IPv6 literals and internationalized hosts are validated by urlparse
+        return urlparse(url).netloc
+    return netloc
+
 class CitationGenerator:
     """
     Generate proper citations in multiple academic formats
     """
     
+    # Citation templates keyed by (style, source type, has author); a source
+    # type of None is the style's default
+    _CITATION_TEMPLATES = {
+        # APA: Author (Year). Title. [Site.] Retrieved from URL
+        ('apa', 'encyclopedia', True): "{author} ({year}). {title}. In {domain}. Retrieved from {url}",
+        ('apa', 'encyclopedia', False): "{title}. ({year}). In {domain}. Retrieved from {url}",
+        ('apa', 'news', True): "{author} ({year}). {title}. {domain}. Retrieved from {url}",
+        ('apa', 'news', False): "{title}. ({year}). {domain}. Retrieved from {url}",
+        ('apa', None, True): "{author} ({year}). {title}. Retrieved from {url}",
+        ('apa', None, False): "{title}. ({year}). Retrieved from {url}",
+        # MLA: Author. "Title." Site, Date. Web. Access Date.
+        ('mla', None, True): '{author}. "{title}." {domain}, {mla_date}. Web. {mla_access_date}.',
+        ('mla', None, False): '"{title}." {domain}, {mla_date}. Web. {mla_access_date}.',
+        # Chicago: Author. "Title." Site. Accessed Date. URL.
+        ('chicago', None, True): '{author}. "{title}." {domain}. Accessed {chicago_access_date}. {url}.',
+        ('chicago', None, False): '"{title}." {domain}. Accessed {chicago_access_date}. {url}.',
+        # Harvard: Author (Year) 'Title', Site, viewed Date, <URL>.
+        ('harvard', None, True): "{author} ({year}) '{title}', {domain}, viewed {harvard_access_date}, <{url}>.",
+        ('harvard', None, False): "'{title}' ({year}), {domain}, viewed {harvard_access_date}, <{url}>.",
+        # IEEE: Author, "Title," Site, Year. [Online]. Available: URL
+        ('ieee', None, True): '{author}, "{title}," {domain}, {year}. [Online]. Available: {url}',
+        ('ieee', None, False): '"{title}," {domain}, {year}. [Online]. Available: {url}'
+    }
+    _CITATION_STYLES = ('apa', 'mla', 'chicago', 'harvard', 'ieee')
+    
     def __init__(self):
         # Academic domain patterns for source type detection
         self.academic_domains = {
@@ -36,32 +109,28 @@ class CitationGenerator:
             'cnn.com', 'bbc.com', 'reuters.com', 'nytimes.com', 
             'washingtonpost.com', 'theguardian.com', 'wsj.com'
         }
+        
+        # Known domains as a trie of reversed labels ('mit.edu' is stored as
+        # trie['edu']['mit']), so hosts match on whole-label suffixes only;
+        # the None key of a node holds the source type of that domain
+        self._suffix_trie = {}
+        for domain, source_type in [*self.academic_domains.items(),
+                                    *((news_domain, 'news') for news_domain in self.news_domains)]:
+            node = self._suffix_trie
+            for label in reversed(domain.split('.')):
+                node = node.setdefault(label, {})
+            node[None] = source_type
+        # Bibliographies cite a handful of domains many times over
+        self._cached_source_type = lru_cache(maxsize=1024)(self._determine_source_type)
     
-    def generate_citations_for_source(self, source: Dict[str, str]) -> Dict[str, str]:
+    def generate_citations_for_source(self, source: Dict[str, str],
+                                      access_dates: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         """
         Generate citations in multiple formats for a single source
         """
         try:
-            # Extract and clean source information
-            title = self._clean_title(source.get('title', 'Untitled'))
-            url = source.get('url', '')
-            domain = urlparse(url).netloc if url else ''
-            
-            # Extract additional metadata
-            author = self._extract_author_from_source(source)
-            date = self._extract_date_from_source(source)
-            source_type = self._determine_source_type(domain)
-            
-            # Generate all citation formats
-            citations = {
-                'apa': self._generate_apa_citation(title, author, date, url, domain, source_type),
-                'mla': self._generate_mla_citation(title, author, date, url, domain, source_type),
-                'chicago': self._generate_chicago_citation(title, author, date, url, domain, source_type),
-                'harvard': self._generate_harvard_citation(title, author, date, url, domain, source_type),
-                'ieee': self._generate_ieee_citation(title, author, date, url, domain, source_type)
-            }
-            
-            return citations
+            ctx = self._extract_metadata(source, access_dates)
+            return self._render_all(ctx)
             
         except Exception as e:
             logger.error(f"Citation generation failed: {e}")
@@ -73,20 +142,28 @@ class CitationGenerator:
         """
         try:
             bibliography_entries = []
+            access_dates = self._access_dates()
+            
+            # Only the requested style is rendered (unknown styles fall back to APA)
+            style = style.lower()
+            render_style = style if style in self._CITATION_STYLES else 'apa'
             
             for i, source in enumerate(sources, 1):
-                citations = self.generate_citations_for_source(source)
-                citation = citations.get(style.lower(), citations.get('apa', ''))
+                try:
+                    citation = self._render_style(self._extract_metadata(source, access_dates), render_style)
+                except Exception as e:
+                    logger.error(f"Citation generation failed: {e}")
+                    citation = self._generate_fallback_citations(source)[render_style]
                 
                 if citation:
                     # Add numbering for some styles
-                    if style.lower() in ['ieee']:
+                    if style in ['ieee']:
                         bibliography_entries.append(f"[{i}] {citation}")
                     else:
                         bibliography_entries.append(citation)
             
             # Join with appropriate separators
-            if style.lower() == 'apa':
+            if style == 'apa':
                 return '\n\n'.join(bibliography_entries)
             else:
                 return '\n'.join(bibliography_entries)
@@ -95,132 +172,55 @@ class CitationGenerator:
             logger.error(f"Bibliography generation failed: {e}")
             return "Bibliography generation failed. Please check source data."
     
-    def _generate_apa_citation(self, title: str, author: str, date: str, url: str, domain: str, source_type: str) -> str:
-        """Generate APA format citation"""
-        try:
-            # Clean components
-            author = author if author != "Unknown Author" else ""
-            year = self._extract_year(date) if date else "n.d."
-            
-            # Build citation based on source type
-            if source_type == 'journal':
-                if author:
-                    return f"{author} ({year}). {title}. Retrieved from {url}"
-                else:
-                    return f"{title}. ({year}). Retrieved from {url}"
-            
-            elif source_type == 'encyclopedia':
-                if author:
-                    return f"{author} ({year}). {title}. In {domain}. Retrieved from {url}"
-                else:
-                    return f"{title}. ({year}). In {domain}. Retrieved from {url}"
-            
-            elif source_type == 'news':
-                if author:
-                    return f"{author} ({year}). {title}. {domain}. Retrieved from {url}"
-                else:
-                    return f"{title}. ({year}). {domain}. Retrieved from {url}"
-            
-            else:  # web or academic
-                if author:
-                    return f"{author} ({year}). {title}. Retrieved from {url}"
-                else:
-                    return f"{title}. ({year}). Retrieved from {url}"
-                    
-        except Exception as e:
-            logger.error(f"APA citation generation failed: {e}")
-            return f"{title}. Retrieved from {url}"
-    
-    def _generate_mla_citation(self, title: str, author: str, date: str, url: str, domain: str, source_type: str) -> str:
-        """Generate MLA format citation"""
-        try:
-            # Format date for MLA
-            formatted_date = self._format_date_mla(date) if date else "n.d."
-            access_date = datetime.now().strftime("%d %b %Y")
-            
-            # Build citation
-            if author and author != "Unknown Author":
-                citation = f'{author}. "{title}." {domain}, {formatted_date}. Web. {access_date}.'
-            else:
-                citation = f'"{title}." {domain}, {formatted_date}. Web. {access_date}.'
-            
-            return citation
-            
-        except Exception as e:
-            logger.error(f"MLA citation generation failed: {e}")
-            return f'"{title}." {domain}. Web. {datetime.now().strftime("%d %b %Y")}.'
+    def _access_dates(self) -> Dict[str, str]:
+        """Today's date in each style's access-date format"""
+        now = datetime.now()
+        return {
+            'mla_access_date': now.strftime("%d %b %Y"),
+            'chicago_access_date': now.strftime("%B %d, %Y"),
+            'harvard_access_date': now.strftime("%d %B %Y")
+        }
     
-    def _generate_chicago_citation(self, title: str, author: str, date: str, url: str, domain: str, source_type: str) -> str:
-        """Generate Chicago format citation"""
-        try:
-            access_date = datetime.now().strftime("%B %d, %Y")
-            
-            # Build citation
-            if author and author != "Unknown Author":
-                citation = f'{author}. "{title}." {domain}. Accessed {access_date}. {url}.'
-            else:
-                citation = f'"{title}." {domain}. Accessed {access_date}. {url}.'
-            
-            return citation
-            
-        except Exception as e:
-            logger.error(f"Chicago citation generation failed: {e}")
-            return f'"{title}." {domain}. Accessed {datetime.now().strftime("%B %d, %Y")}. {url}.'
+    def _extract_metadata(self, source: Dict[str, str],
+                          access_dates: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Collect the template context every citation style renders from"""
+        # Extract and clean source information
+        title = self._clean_title(source.get('title', 'Untitled'))
+        url = source.get('url', '')
+        domain = _parse_domain(url) if url else ''
+        
+        # Extract additional metadata
+        author = self._extract_author_from_source(source)
+        date = self._extract_date_from_source(source)
+        
+        return {
+            'title': title,
+            'author': author,
+            'has_author': bool(author) and author != "Unknown Author",
+            'year': self._extract_year(date),
+            'mla_date': self._format_date_mla(date),
+            'url': url,
+            'domain': domain,
+            'source_type': self._cached_source_type(domain),
+            **(access_dates or self._access_dates())
+        }
     
-    def _generate_harvard_citation(self, title: str, author: str, date: str, url: str, domain: str, source_type: str) -> str:
-        """Generate Harvard format citation"""
-        try:
-            year = self._extract_year(date) if date else "n.d."
-            
-            # Build citation
-            if author and author != "Unknown Author":
-                citation = f"{author} ({year}) '{title}', {domain}, viewed {datetime.now().strftime('%d %B %Y')}, <{url}>."
-            else:
-                citation = f"'{title}' ({year}), {domain}, viewed {datetime.now().strftime('%d %B %Y')}, <{url}>."
-            
-            return citation
-            
-        except Exception as e:
-            logger.error(f"Harvard citation generation failed: {e}")
-            return f"'{title}' ({self._extract_year(date) if date else 'n.d.'}), {domain}, <{url}>."
+    def _render_style(self, ctx: Dict[str, Any], style: str) -> str:
+        """Fill in the citation template for a style and the source's type"""
+        templates = self._CITATION_TEMPLATES
+        template = (templates.get((style, ctx['source_type'], ctx['has_author']))
+                    or templates[(style, None, ctx['has_author'])])
+        return template.format_map(ctx)
     
-    def _generate_ieee_citation(self, title: str, author: str, date: str, url: str, domain: str, source_type: str) -> str:
-        """Generate IEEE format citation"""
-        try:
-            year = self._extract_year(date) if date else "n.d."
-            
-            # Build citation
-            if author and author != "Unknown Author":
-                citation = f'{author}, "{title}," {domain}, {year}. [Online]. Available: {url}'
-            else:
-                citation = f'"{title}," {domain}, {year}. [Online]. Available: {url}'
-            
-            return citation
-            
-        except Exception as e:
-            logger.error(f"IEEE citation generation failed: {e}")
-            return f'"{title}," {domain}. [Online]. Available: {url}'
+    def _render_all(self, ctx: Dict[str, Any]) -> Dict[str, str]:
+        """Render the source in every citation style"""
+        return {style: self._render_style(ctx, style) for style in self._CITATION_STYLES}
     
     def _clean_title(self, title: str) -> str:
         """Clean and format title"""
-        # Remove extra whitespace and common suffixes
-        title = re.sub(r'\s+', ' ', title).strip()
-        
-        # Remove common website suffixes
-        suffixes_to_remove = [
-            ' - Wikipedia',
-            ' | Wikipedia',
-            ' - Google Scholar',
-            ' | Google Scholar',
-            ' - ResearchGate',
-            ' | ResearchGate'
-        ]
-        
-        for suffix in suffixes_to_remove:
-            if title.endswith(suffix):
-                title = title[:-len(suffix)].strip()
-        
-        return title
+        # Remove extra whitespace and common website suffixes
+        title = _WS_RE.sub(' ', title).strip()
+        return _SUFFIX_RE.sub('', title, count=1).strip()
     
     def _extract_author_from_source(self, source: Dict[str, str]) -> str:
         """Extract author information from source"""
@@ -228,14 +228,8 @@ class CitationGenerator:
         title = source.get('title', '')
         
         # Look for author patterns in title
-        author_patterns = [
-            r'by\s+([A-Z][a-z]+\s+[A-Z][a-z]+)',  # "by John Doe"
-            r'([A-Z][a-z]+\s+[A-Z]\.\s+[A-Z][a-z]+)',  # "John A. Doe"
-            r'([A-Z][a-z]+,\s+[A-Z]\.)' # "Doe, J."
-        ]
-        
-        for pattern in author_patterns:
-            match = re.search(pattern, title)
+        for pattern in _AUTHOR_PATTERNS:
+            match = pattern.search(title)
             if match:
                 return match.group(1).strip()
         
@@ -249,24 +243,27 @@ class CitationGenerator:
     
     def _determine_source_type(self, domain: str) -> str:
         """Determine the type of source based on domain"""
-        domain_lower = domain.lower()
-        
-        # Check academic domains
-        for academic_domain, source_type in self.academic_domains.items():
-            if academic_domain in domain_lower:
-                return source_type
+        # Reduce the netloc to its host labels ("user@www.MIT.edu:443" -> www, mit, edu)
+        host = domain.lower().rpartition('@')[2].partition(':')[0].strip('.')
+        labels = host.split('.')
         
-        # Check news domains
-        for news_domain in self.news_domains:
-            if news_domain in domain_lower:
-                return 'news'
+        # Check academic and news domains, the longest matching suffix winning
+        node = self._suffix_trie
+        source_type = None
+        for label in reversed(labels):
+            node = node.get(label)
+            if node is None:
+                break
+            source_type = node.get(None, source_type)
+        if source_type:
+            return source_type
         
-        # Check for educational institutions
-        if '.edu' in domain_lower:
+        # Check for educational institutions (an 'edu' label: mit.edu, unsw.edu.au)
+        if 'edu' in labels:
             return 'academic'
         
         # Check for government sites
-        if '.gov' in domain_lower:
+        if 'gov' in labels:
             return 'government'
         
         # Default to web
@@ -278,7 +275,7 @@ class CitationGenerator:
             return "n.d."
         
         # Look for 4-digit year
-        year_match = re.search(r'\b(19|20)\d{2}\b', date_str)
+        year_match = _YEAR_RE.search(date_str)
         if year_match:
             return year_match.group()
         
@@ -292,7 +289,7 @@ class CitationGenerator:
         try:
             # Try to parse and format date
             # This is a simplified version - can be enhanced with dateutil
-            year_match = re.search(r'\b(19|20)\d{2}\b', date_str)
+            year_match = _YEAR_RE.search(date_str)
             if year_match:
                 return year_match.group()
             return "n.d."
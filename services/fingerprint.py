@@ -0,0 +1,107 @@
+# services/fingerprint.py - k-gram fingerprinting with winnowing
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Any, Set
+
+from rapidfuzz import fuzz
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+class FingerprintIndex:
+    """
+    MOSS-style document index: every document is reduced to a small set of
+    winnowed k-gram hashes, so candidate sources are found by hash lookup
+    instead of comparing the query against every stored document
+    """
+
+    def __init__(self, k: int = 5, window: int = 10):
+        self.k = k              # Words per k-gram
+        self.window = window    # k-grams per winnowing window
+        self._postings: Dict[int, Set[str]] = defaultdict(set)
+        self._documents: Dict[str, str] = {}
+        self._fingerprints: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def fingerprint(self, text: str) -> Set[int]:
+        """Select the winnowed k-gram hashes of a text"""
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < self.k:
+            return set()
+
+        hashes = [
+            self._hash(" ".join(words[i:i + self.k]))
+            for i in range(len(words) - self.k + 1)
+        ]
+        if len(hashes) <= self.window:
+            return {min(hashes)}
+
+        # Keep the minimum hash of every window (the rightmost one on ties);
+        # a monotonic deque of candidate positions makes this a single pass
+        selected = set()
+        candidates = deque()
+        last = -1
+        for i, h in enumerate(hashes):
+            while candidates and hashes[candidates[-1]] >= h:
+                candidates.pop()
+            candidates.append(i)
+            if candidates[0] <= i - self.window:
+                candidates.popleft()
+            if i >= self.window - 1 and candidates[0] != last:
+                last = candidates[0]
+                selected.add(hashes[last])
+        return selected
+
+    def add(self, document_id: str, text: str) -> None:
+        """Index a document, replacing any previous version with the same id"""
+        self.remove(document_id)
+        fingerprints = self.fingerprint(text)
+        for h in fingerprints:
+            self._postings[h].add(document_id)
+        self._documents[document_id] = text
+        self._fingerprints[document_id] = fingerprints
+
+    def remove(self, document_id: str) -> None:
+        """Drop a document from the index"""
+        for h in self._fingerprints.pop(document_id, ()):
+            postings = self._postings[h]
+            postings.discard(document_id)
+            if not postings:
+                del self._postings[h]
+        self._documents.pop(document_id, None)
+
+    def query(self, text: str, limit: int = 5, min_shared: int = 1) -> List[Dict[str, Any]]:
+        """
+        Find indexed documents sharing fingerprints with the text, ranked by
+        token-set similarity
+        """
+        shared = Counter()
+        for h in self.fingerprint(text):
+            shared.update(self._postings.get(h, ()))
+
+        candidates = [
+            (document_id, count) for document_id, count in shared.most_common(limit * 2)
+            if count >= min_shared
+        ]
+        results = [
+            {
+                "document_id": document_id,
+                "shared_fingerprints": count,
+                "similarity": fuzz.token_set_ratio(text, self._documents[document_id]) / 100.0
+            }
+            for document_id, count in candidates
+        ]
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+
+        logger.info(f"Fingerprint query: {len(shared)} candidates, {len(results[:limit])} ranked")
+        return results[:limit]
+
+    @staticmethod
+    def _hash(gram: str) -> int:
+        """Stable 64-bit hash of a k-gram, identical across processes"""
+        return int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "big")
@@ -1,28 +1,50 @@
 # services/plagiarism_analyzer.py
 import uuid
-import re
+from array import array
 import hashlib
-from datetime import datetime
-from typing import Dict, List, Any
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True, slots=True)
+class SourceInfo:
+    """
+    A known source; as_dict() gives the JSON shape attached to its matches
+    """
+    id: str
+    title: str
+    url: str
+    author: str
+    domain: str
+    type: str
+    published: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            name: value for name in _SOURCE_INFO_FIELDS
+            if (value := getattr(self, name)) is not None
+        }
+
+_SOURCE_INFO_FIELDS = tuple(field.name for field in fields(SourceInfo))
+
 class PlagiarismAnalyzer:
     def __init__(self):
         # Database of known phrases/sentences for demo purposes
         # In production, this would connect to academic databases
         self.known_sources = {
             "artificial intelligence": {
-                "source": {
-                    "id": "src_001",
-                    "title": "Introduction to Artificial Intelligence and Machine Learning",
-                    "url": "https://example-university.edu/ai-ml-intro",
-                    "author": "Dr. Jane Smith",
-                    "domain": "example-university.edu",
-                    "type": "academic",
-                    "published": "2023-06-15"
-                },
+                "source": SourceInfo(
+                    id="src_001",
+                    title="Introduction to Artificial Intelligence and Machine Learning",
+                    url="https://example-university.edu/ai-ml-intro",
+                    author="Dr. Jane Smith",
+                    domain="example-university.edu",
+                    type="academic",
+                    published="2023-06-15"
+                ),
                 "phrases": [
                     "artificial intelligence and machine learning have revolutionized",
                     "machine learning algorithms",
@@ -32,15 +54,15 @@ class PlagiarismAnalyzer:
                 ]
             },
             "climate change": {
-                "source": {
-                    "id": "src_002", 
-                    "title": "Climate Change and Environmental Impact",
-                    "url": "https://climate-research.org/environmental-study",
-                    "author": "Dr. Michael Johnson",
-                    "domain": "climate-research.org",
-                    "type": "academic",
-                    "published": "2023-08-20"
-                },
+                "source": SourceInfo(
+                    id="src_002", 
+                    title="Climate Change and Environmental Impact",
+                    url="https://climate-research.org/environmental-study",
+                    author="Dr. Michael Johnson",
+                    domain="climate-research.org",
+                    type="academic",
+                    published="2023-08-20"
+                ),
                 "phrases": [
                     "climate change represents one of the most pressing challenges",
                     "global warming and climate change",
@@ -49,15 +71,15 @@ class PlagiarismAnalyzer:
                 ]
             },
             "human brain": {
-                "source": {
-                    "id": "src_003",
-                    "title": "Neuroscience and Brain Function Research", 
-                    "url": "https://neuro-institute.edu/brain-research",
-                    "author": "Dr. Sarah Wilson",
-                    "domain": "neuro-institute.edu",
-                    "type": "academic",
-                    "published": "2023-04-10"
-                },
+                "source": SourceInfo(
+                    id="src_003",
+                    title="Neuroscience and Brain Function Research", 
+                    url="https://neuro-institute.edu/brain-research",
+                    author="Dr. Sarah Wilson",
+                    domain="neuro-institute.edu",
+                    type="academic",
+                    published="2023-04-10"
+                ),
                 "phrases": [
                     "human brain contains approximately 86 billion neurons",
                     "neurons connected through synapses",
@@ -66,15 +88,15 @@ class PlagiarismAnalyzer:
                 ]
             },
             "machine learning": {
-                "source": {
-                    "id": "src_004",
-                    "title": "Advanced Machine Learning Techniques",
-                    "url": "https://tech-university.edu/ml-advanced",
-                    "author": "Prof. David Chen", 
-                    "domain": "tech-university.edu",
-                    "type": "academic",
-                    "published": "2023-09-12"
-                },
+                "source": SourceInfo(
+                    id="src_004",
+                    title="Advanced Machine Learning Techniques",
+                    url="https://tech-university.edu/ml-advanced",
+                    author="Prof. David Chen", 
+                    domain="tech-university.edu",
+                    type="academic",
+                    published="2023-09-12"
+                ),
                 "phrases": [
                     "machine learning enables computers to learn from experience",
                     "supervised and unsupervised learning",
@@ -84,6 +106,48 @@ class PlagiarismAnalyzer:
             }
         }
 
+        # Common academic phrases, reported at a lower similarity
+        self.common_phrases = [
+            "research shows that",
+            "studies have shown",
+            "according to research",
+            "it is important to note",
+            "in conclusion",
+            "furthermore",
+            "however",
+            "therefore"
+        ]
+        self.common_phrase_source = SourceInfo(
+            id="common_phrase",
+            title="Common Academic Phrases",
+            url="https://academic-writing.edu/common-phrases",
+            author="Academic Writing Guide",
+            domain="academic-writing.edu",
+            type="reference"
+        )
+
+        # Every phrase to look for, flattened into parallel arrays: phrase i
+        # belongs to self._sources[self._phrase_src_idx[i]]
+        # (each source is converted to a dict once and shared by its matches)
+        self._sources = [source_data["source"].as_dict() for source_data in self.known_sources.values()]
+        self._sources.append(self.common_phrase_source.as_dict())
+        self._common_source_idx = len(self._sources) - 1
+        self._phrases = tuple(
+            phrase
+            for source_data in self.known_sources.values()
+            for phrase in source_data["phrases"]
+        ) + tuple(self.common_phrases)
+        self._phrase_src_idx = array('i', [
+            source_idx
+            for source_idx, source_data in enumerate(self.known_sources.values())
+            for _ in source_data["phrases"]
+        ] + [self._common_source_idx] * len(self.common_phrases))
+        # Lowercased once here rather than for every document
+        self._phrases_lower = tuple(phrase.lower() for phrase in self._phrases)
+        self._phrase_lens = array('i', map(len, self._phrases_lower))
+        # Texts shorter than this cannot contain any phrase
+        self._min_phrase_len = min(self._phrase_lens)
+
     def analyze_document(self, text: str, filename: str) -> Dict[str, Any]:
         """
         Analyze document for plagiarism by checking against known sources
@@ -93,10 +157,9 @@ class PlagiarismAnalyzer:
             
             # Clean and prepare text
             clean_text = self._clean_text(text)
-            sentences = self._split_into_sentences(clean_text)
             
             # Find matches
-            matches = self._find_matches(clean_text, sentences)
+            matches = self._find_matches(clean_text)
             
             # Calculate similarity
             overall_similarity = self._calculate_overall_similarity(clean_text, matches)
@@ -111,18 +174,13 @@ class PlagiarismAnalyzer:
                 "overallSimilarity": overall_similarity,
                 "riskLevel": risk_level,
                 "status": "completed",
-                "analyzedAt": datetime.now().isoformat(),
+                "analyzedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "filename": filename,
                 "original_text": text,
                 "word_count": len(text.split()),
                 "character_count": len(text),
                 "matches": matches,
-                "analysis_summary": {
-                    "total_matches": len(matches),
-                    "sources_found": len(set(match.get("source", {}).get("id", "") for match in matches)),
-                    "highest_similarity": max([match.get("similarity", 0) for match in matches]) if matches else 0,
-                    "match_types": self._categorize_matches(matches)
-                }
+                "analysis_summary": self._summarize_matches(matches)
             }
             
             logger.info(f"Analysis completed: {overall_similarity:.1%} similarity, {len(matches)} matches")
@@ -134,57 +192,54 @@ class PlagiarismAnalyzer:
 
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text for analysis"""
-        # Remove extra whitespace and normalize
-        text = re.sub(r'\s+', ' ', text.strip())
-        # Convert to lowercase for matching
-        return text.lower()
-
-    def _split_into_sentences(self, text: str) -> List[str]:
-        """Split text into sentences"""
-        # Simple sentence splitting
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
+        # Collapse whitespace runs (split/join, no regex) and lowercase for matching
+        return ' '.join(text.split()).lower()
 
-    def _find_matches(self, clean_text: str, sentences: List[str]) -> List[Dict[str, Any]]:
-        """Find matches against known sources"""
+    def _find_matches(self, clean_text: str) -> List[Dict[str, Any]]:
+        """Find matches against known sources and common academic phrases"""
         matches = []
+        if len(clean_text) < self._min_phrase_len:
+            return matches
         
-        for category, source_data in self.known_sources.items():
-            source_info = source_data["source"]
-            phrases = source_data["phrases"]
+        for i, phrase in enumerate(self._phrases):
+            source_idx = self._phrase_src_idx[i]
+            source_info = self._sources[source_idx]
+            phrase_lower = self._phrases_lower[i]
+            phrase_len = self._phrase_lens[i]
             
-            # Check each known phrase against the text
-            for phrase in phrases:
-                phrase_lower = phrase.lower()
+            # A find hit is the phrase itself, so every known-source hit is exact
+            if source_idx == self._common_source_idx:
+                similarity = 70
+                occurrence_type = "common_phrase"
+            else:
+                similarity = 95
+                occurrence_type = "exact"
+            
+            # Report every non-overlapping occurrence, not just the first
+            hits = 0
+            start_pos = clean_text.find(phrase_lower)
+            while start_pos >= 0:
+                end_pos = start_pos + phrase_len
                 
-                # Find exact and partial matches
-                if phrase_lower in clean_text:
-                    # Find the position in original text
-                    start_pos = clean_text.find(phrase_lower)
-                    end_pos = start_pos + len(phrase_lower)
-                    
-                    # Calculate similarity (exact match = 95%, partial = lower)
-                    similarity = 95 if phrase_lower == clean_text[start_pos:end_pos] else 85
-                    
-                    # Extract the actual matched text from original
-                    original_match = clean_text[start_pos:end_pos]
-                    
-                    match = {
-                        "originalText": original_match,
-                        "matchedText": phrase,
-                        "similarity": similarity,
-                        "startIndex": start_pos,
-                        "endIndex": end_pos,
-                        "source": source_info,
-                        "matchType": "exact" if similarity >= 95 else "paraphrased",
-                        "confidence": similarity / 100.0
-                    }
-                    
-                    matches.append(match)
-                    logger.info(f"Found match: '{original_match}' -> {similarity}% similarity")
-        
-        # Also check for partial phrase matches
-        matches.extend(self._find_partial_matches(clean_text))
+                match = {
+                    "originalText": phrase_lower,
+                    "matchedText": phrase,
+                    "similarity": similarity,
+                    "startIndex": start_pos,
+                    "endIndex": end_pos,
+                    "source": source_info,
+                    "matchType": occurrence_type,
+                    "confidence": similarity / 100.0
+                }
+                
+                matches.append(match)
+                hits += 1
+                
+                start_pos = clean_text.find(phrase_lower, end_pos)
+            
+            # One line per phrase, however often it repeats
+            if hits:
+                logger.info(f"Found {hits} match(es): '{phrase_lower}' -> {similarity}% similarity")
         
         # Remove duplicates and sort by similarity
         matches = self._deduplicate_matches(matches)
@@ -192,61 +247,18 @@ class PlagiarismAnalyzer:
         
         return matches
 
-    def _find_partial_matches(self, text: str) -> List[Dict[str, Any]]:
-        """Find partial matches using word overlap"""
-        partial_matches = []
-        
-        # Check for common academic phrases
-        common_phrases = [
-            ("research shows that", "Common academic phrase"),
-            ("studies have shown", "Common academic phrase"), 
-            ("according to research", "Common academic phrase"),
-            ("it is important to note", "Common academic phrase"),
-            ("in conclusion", "Common academic phrase"),
-            ("furthermore", "Common academic phrase"),
-            ("however", "Common transition word"),
-            ("therefore", "Common transition word")
-        ]
-        
-        for phrase, description in common_phrases:
-            if phrase in text:
-                start_pos = text.find(phrase)
-                end_pos = start_pos + len(phrase)
-                
-                partial_match = {
-                    "originalText": phrase,
-                    "matchedText": phrase,
-                    "similarity": 70,
-                    "startIndex": start_pos,
-                    "endIndex": end_pos,
-                    "source": {
-                        "id": "common_phrase",
-                        "title": "Common Academic Phrases",
-                        "url": "https://academic-writing.edu/common-phrases",
-                        "author": "Academic Writing Guide",
-                        "domain": "academic-writing.edu",
-                        "type": "reference"
-                    },
-                    "matchType": "common_phrase",
-                    "confidence": 0.7
-                }
-                partial_matches.append(partial_match)
-        
-        return partial_matches
-
     def _deduplicate_matches(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate matches"""
-        seen = set()
-        unique_matches = []
+        """Keep the highest-similarity match for each span"""
+        best = {}
         
         for match in matches:
-            # Create a unique key based on position and text
-            key = (match["startIndex"], match["endIndex"], match["originalText"])
-            if key not in seen:
-                seen.add(key)
-                unique_matches.append(match)
+            # The span alone identifies the matched text within clean_text
+            key = (match["startIndex"], match["endIndex"])
+            current = best.get(key)
+            if current is None or match["similarity"] > current["similarity"]:
+                best[key] = match
         
-        return unique_matches
+        return list(best.values())
 
     def _calculate_overall_similarity(self, text: str, matches: List[Dict[str, Any]]) -> float:
         """Calculate overall document similarity percentage"""
@@ -257,18 +269,16 @@ class PlagiarismAnalyzer:
         total_chars = len(text)
         matched_chars = 0
         
-        # Track overlapping regions to avoid double counting
-        covered_positions = set()
-        
-        for match in matches:
-            start = match["startIndex"]
-            end = match["endIndex"]
-            
-            # Count non-overlapping characters
-            for pos in range(start, end):
-                if pos not in covered_positions:
-                    covered_positions.add(pos)
-                    matched_chars += 1
+        # Merge overlapping regions to avoid double counting
+        intervals = sorted((match["startIndex"], match["endIndex"]) for match in matches)
+        current_start, current_end = intervals[0]
+        for start, end in intervals[1:]:
+            if start <= current_end:
+                current_end = max(current_end, end)
+            else:
+                matched_chars += current_end - current_start
+                current_start, current_end = start, end
+        matched_chars += current_end - current_start
         
         # Calculate percentage
         similarity = (matched_chars / total_chars) if total_chars > 0 else 0.0
@@ -285,16 +295,27 @@ class PlagiarismAnalyzer:
         else:
             return "Low"
 
-    def _categorize_matches(self, matches: List[Dict[str, Any]]) -> Dict[str, int]:
-        """Categorize matches by type"""
+    def _summarize_matches(self, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Count sources, the best similarity and matches by type in one pass"""
+        source_ids = set()
+        highest_similarity = 0
         categories = {"exact": 0, "paraphrased": 0, "common_phrase": 0}
         
         for match in matches:
+            source_ids.add(match.get("source", {}).get("id", ""))
+            similarity = match.get("similarity", 0)
+            if similarity > highest_similarity:
+                highest_similarity = similarity
             match_type = match.get("matchType", "paraphrased")
             if match_type in categories:
                 categories[match_type] += 1
         
-        return categories
+        return {
+            "total_matches": len(matches),
+            "sources_found": len(source_ids),
+            "highest_similarity": highest_similarity,
+            "match_types": categories
+        }
 
     def generate_citation(self, source: Dict[str, Any], style: str = "APA") -> str:
         """Generate citation in requested style"""
@@ -1,17 +1,66 @@
 # services/plagiarism_detector.py - Phase 3: Fixed Web Search
+import aiohttp
 import asyncio
+import hashlib
 import logging
+import os
 import re
-import requests
-from typing import Dict, List, Any, Tuple
+import sqlite3
+import string
+import time
+from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urljoin, urlparse, quote_plus
-from bs4 import BeautifulSoup
-import difflib
+from bs4 import BeautifulSoup, SoupStrainer
+from rapidfuzz import fuzz, process
 from datetime import datetime
+from functools import lru_cache
 import json
 
+from .cache import DiskCache, TTLCache, private_cache_path
+
+# Parse search pages with libxml2 when lxml is installed
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    _HTML_PARSER = 'html.parser'
+
 logger = logging.getLogger(__name__)
 
+# Host labels that identify a source type ("pubmed.ncbi.nlm.nih.gov" has the
+# label "pubmed"); whole labels only, so "fakeedu.com" is not academic
+_ACADEMIC_LABELS = frozenset({'edu', 'scholar', 'researchgate', 'arxiv', 'pubmed'})
+_NEWS_LABELS = frozenset({
+    'news', 'cnn', 'bbc', 'reuters', 'nytimes', 'theguardian', 'washingtonpost', 'wsj'
+})
+_ENCYCLOPEDIA_LABELS = frozenset({'wikipedia'})
+
+_SENT_RE = re.compile(r'[.!?]+')
+_RESULT_CLASS_RE = re.compile(r'result')
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+# Only the result blocks of a search page are built into a tree
+# (the strainer sees the raw class attribute, so multi-class tags need a regex)
+_BING_RESULTS = SoupStrainer('li', class_=re.compile(r'(?:^|\s)b_algo(?:\s|$)'))
+_DDG_RESULTS = SoupStrainer('div', class_=_RESULT_CLASS_RE)
+_NONWORD_RE = re.compile(r'[^\w\s]')
+# The ASCII characters _NONWORD_RE removes, for a translate() fast path
+_ASCII_NONWORD_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if _NONWORD_RE.match(c)
+))
+
+@lru_cache(maxsize=512)
+def _source_type_for_domain(domain: str) -> str:
+    """Classify a netloc by its host labels; memoized as sources repeat across matches"""
+    labels = set(domain.lower().rpartition('@')[2].partition(':')[0].split('.'))
+    if labels & _ACADEMIC_LABELS:
+        return 'academic'
+    elif labels & _NEWS_LABELS:
+        return 'news'
+    elif labels & _ENCYCLOPEDIA_LABELS:
+        return 'encyclopedia'
+    else:
+        return 'web'
+
 class PlagiarismDetector:
     """
     Advanced plagiarism detection service with web search integration
@@ -21,6 +70,33 @@ class PlagiarismDetector:
         self.similarity_threshold = 0.6  # 60% similarity threshold
         self.min_sentence_length = 10   # Minimum words per sentence
         self.max_search_results = 5     # Results per search
+        self.max_concurrent_searches = 8  # Sentences searched at once
+        
+        # Search results by sentence, reused across documents
+        self._search_cache = TTLCache(maxsize=2048, ttl=3600)
+        
+        # Parsed results per (engine, query) in an SQLite cache shared by all
+        # workers and restarts, so re-analyzed text needs no new requests
+        self.engine_cache_ttl = 7 * 24 * 3600
+        cache_path = None
+        try:
+            cache_path = os.environ.get('PLAGIARISM_CACHE_PATH') or private_cache_path('plagiarism_cache.sqlite')
+            self._disk_cache: Optional[DiskCache] = DiskCache(cache_path, ttl=self.engine_cache_ttl)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Search disk cache unavailable at {cache_path}: {e}")
+            self._disk_cache = None
+        
+        # Search engines in the order they are tried: (name, search, fallback only)
+        self._engines = [
+            ('Google', self._search_google, False),   # Needs an API key; no-op for now
+            ('Bing', self._search_bing, False),
+            ('DuckDuckGo', self._search_duckduckgo, True)  # Only if the others found nothing
+        ]
+        
+        # Request rate per engine (requests/second); concurrent searches are
+        # spaced out rather than sent in bursts, without pausing between batches
+        self.engine_rates = {'bing': 5.0, 'duckduckgo': 5.0}
+        self._next_request_at = {engine: 0.0 for engine in self.engine_rates}
         
         # Headers to avoid bot detection
         self.headers = {
@@ -31,6 +107,56 @@ class PlagiarismDetector:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
+        
+        # Shared HTTP session, created on first use and reused by every search
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._timeout = aiohttp.ClientTimeout(total=10, connect=5)
+    
+    async def __aenter__(self) -> "PlagiarismDetector":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    async def start(self) -> None:
+        """Open the shared HTTP session"""
+        await self._get_session()
+    
+    async def close(self) -> None:
+        """Close the shared HTTP session; call once at application shutdown"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(
+                    limit=20,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=30
+                ),
+                timeout=self._timeout
+            )
+        return self._session
+    
+    async def _fetch(self, url: str) -> bytes:
+        """GET a search page through the shared session, raising on HTTP errors"""
+        session = await self._get_session()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+    
+    async def _throttle(self, engine: str) -> None:
+        """Wait for the engine's next request slot; started requests may overlap"""
+        now = time.monotonic()
+        slot = max(now, self._next_request_at[engine])
+        self._next_request_at[engine] = slot + 1.0 / self.engine_rates[engine]
+        if slot > now:
+            await asyncio.sleep(slot - now)
     
     async def analyze_document(self, text: str, document_title: str) -> Dict[str, Any]:
         """
@@ -50,18 +176,8 @@ class PlagiarismDetector:
             if not valid_sentences:
                 return self._create_empty_result()
             
-            # Search for each sentence in batches
-            all_matches = []
-            batch_size = 3  # Process 3 sentences at a time to avoid rate limiting
-            
-            for i in range(0, len(valid_sentences), batch_size):
-                batch = valid_sentences[i:i + batch_size]
-                batch_matches = await self._search_batch(batch, i)
-                all_matches.extend(batch_matches)
-                
-                # Small delay between batches
-                if i + batch_size < len(valid_sentences):
-                    await asyncio.sleep(2)
+            # Search all sentences concurrently
+            all_matches = await self._search_batch(valid_sentences, 0)
             
             # Calculate overall similarity
             overall_similarity = self._calculate_overall_similarity(valid_sentences, all_matches)
@@ -87,78 +203,158 @@ class PlagiarismDetector:
     def _split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences using basic punctuation"""
         # Simple sentence splitting - can be enhanced with NLTK
-        sentences = re.split(r'[.!?]+', text)
+        sentences = _SENT_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
     async def _search_batch(self, sentences: List[str], start_index: int) -> List[Dict[str, Any]]:
-        """Search for a batch of sentences"""
-        matches = []
-        
+        """Search a batch of sentences concurrently, at most max_concurrent_searches at a time"""
+        # Sentences that only differ in case and punctuation share one search
+        key_to_indices: Dict[Tuple[str, ...], List[int]] = {}
         for i, sentence in enumerate(sentences):
-            try:
-                sentence_index = start_index + i
+            key_to_indices.setdefault(self._sentence_key(sentence), []).append(i)
+        
+        semaphore = asyncio.BoundedSemaphore(self.max_concurrent_searches)
+        search_results = await asyncio.gather(*(
+            self._search_sentence(sentences[indices[0]], start_index + indices[0], semaphore)
+            for indices in key_to_indices.values()
+        ))
+        
+        # Score every copy against its shared results, keeping sentence order
+        sentence_matches: List[List[Dict[str, Any]]] = [[] for _ in sentences]
+        for indices, results in zip(key_to_indices.values(), search_results):
+            for i in indices:
+                sentence_matches[i] = self._match_results(sentences[i], start_index + i, results)
+        return [match for matches in sentence_matches for match in matches]
+    
+    def _sentence_key(self, sentence: str) -> Tuple[str, ...]:
+        """Words of a sentence, lowercased and without punctuation"""
+        return tuple(sentence.lower().translate(_PUNCT_TABLE).split())
+    
+    async def _search_sentence(self, sentence: str, sentence_index: int,
+                               semaphore: asyncio.BoundedSemaphore) -> List[Dict[str, str]]:
+        """Search one sentence, holding a concurrency slot for the duration"""
+        try:
+            async with semaphore:
                 logger.info(f"Searching sentence {sentence_index + 1}: '{sentence[:50]}...'")
                 
                 # Search using multiple methods
-                search_results = await self._search_sentence_comprehensive(sentence)
-                
-                # Analyze each search result
-                for result in search_results:
-                    try:
-                        similarity = self._calculate_similarity(sentence, result['snippet'])
-                        
-                        if similarity >= self.similarity_threshold:
-                            match = {
-                                'original_text': sentence,
-                                'matched_text': result['snippet'],
-                                'similarity': similarity,
-                                'source_url': result['url'],
-                                'source_title': result['title'],
-                                'match_type': self._classify_match(similarity),
-                                'sentence_index': sentence_index
-                            }
-                            matches.append(match)
-                            logger.info(f"Match found: {similarity:.2%} similarity with {result['title']}")
-                    
-                    except Exception as e:
-                        logger.error(f"Error analyzing result: {e}")
-                        continue
+                return await self._search_sentence_comprehensive(sentence)
+        
+        except Exception as e:
+            logger.error(f"Error searching sentence {sentence_index + 1}: {e}")
+            return []
+    
+    def _match_results(self, sentence: str, sentence_index: int,
+                       search_results: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Keep the search results similar enough to the sentence to count as matches"""
+        matches = []
+        
+        similarities = self._similarity_many(
+            sentence, [result['snippet'] for result in search_results], self.similarity_threshold
+        )
+        
+        # Analyze each search result
+        for result, similarity in zip(search_results, similarities):
+            try:
+                if similarity >= self.similarity_threshold:
+                    match = {
+                        'original_text': sentence,
+                        'matched_text': result['snippet'],
+                        'similarity': similarity,
+                        'source_url': result['url'],
+                        'source_title': result['title'],
+                        'match_type': self._classify_match(similarity),
+                        'sentence_index': sentence_index
+                    }
+                    matches.append(match)
+                    logger.info(f"Match found: {similarity:.2%} similarity with {result['title']}")
             
             except Exception as e:
-                logger.error(f"Error searching sentence {sentence_index + 1}: {e}")
+                logger.error(f"Error analyzing result: {e}")
                 continue
         
         return matches
     
     async def _search_sentence_comprehensive(self, sentence: str) -> List[Dict[str, str]]:
         """Comprehensive search using multiple methods"""
+        cached = self._search_cache.get(sentence)
+        if cached is not None:
+            return cached
+        
         all_results = []
+        unique_results = []
         
-        # Method 1: Google search (if available)
-        try:
-            google_results = await self._search_google(sentence)
-            all_results.extend(google_results)
-        except Exception as e:
-            logger.warning(f"Google search failed: {e}")
+        for name, search, fallback_only in self._engines:
+            if fallback_only and unique_results:
+                continue
+            try:
+                all_results.extend(await self._cached_engine_search(name, search, sentence))
+            except Exception as e:
+                logger.warning(f"{name} search failed: {e}")
+                continue
+            
+            # Remove duplicates, stopping early once there are enough results
+            unique_results = self._deduplicate_results(all_results)
+            if len(unique_results) >= self.max_search_results:
+                break
         
-        # Method 2: Bing search
-        try:
-            bing_results = await self._search_bing(sentence)
-            all_results.extend(bing_results)
-        except Exception as e:
-            logger.warning(f"Bing search failed: {e}")
+        unique_results = unique_results[:self.max_search_results]
         
-        # Method 3: DuckDuckGo search (fallback)
-        try:
-            if not all_results:  # Only if other methods failed
-                ddg_results = await self._search_duckduckgo(sentence)
-                all_results.extend(ddg_results)
-        except Exception as e:
-            logger.warning(f"DuckDuckGo search failed: {e}")
+        # Empty results are not cached, so failed searches are retried
+        if unique_results:
+            self._search_cache.set(sentence, unique_results)
+        return unique_results
+    
+    async def _cached_engine_search(self, name: str, search, sentence: str) -> List[Dict[str, str]]:
+        """Run one engine search, reusing its results for a recently sent query"""
+        # Engines only see the first 100 characters of a sentence
+        query = ' '.join(sentence[:100].lower().split())
+        key = hashlib.blake2b(f"{name}\0{query}".encode(), digest_size=16).hexdigest()
         
-        # Remove duplicates and limit results
-        unique_results = self._deduplicate_results(all_results)
-        return unique_results[:self.max_search_results]
+        results = await self._disk_cache_get(key)
+        if results is None:
+            results = await search(sentence)
+            # Empty results are not cached: engines also return [] on errors
+            if results:
+                await self._disk_cache_set(key, results)
+        return results
+    
+    async def _disk_cache_get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        """Read shared cached results; cache failures and unreadable entries count as misses"""
+        if self._disk_cache is None:
+            return None
+        try:
+            cached = await self._run_off_loop(self._disk_cache.get, key)
+            if cached is None or self._valid_results(cached):
+                return cached
+            logger.warning("Dropping unreadable search disk cache entry")
+            await self._run_off_loop(self._disk_cache.delete, key)
+            return None
+        except sqlite3.Error as e:
+            logger.warning(f"Search disk cache read failed: {e}")
+            return None
+    
+    def _valid_results(self, results: Any) -> bool:
+        """Whether a cached value has the shape of engine search results"""
+        return isinstance(results, list) and all(
+            isinstance(result, dict)
+            and all(isinstance(result.get(field), str) for field in ('title', 'url', 'snippet'))
+            for result in results
+        )
+    
+    async def _disk_cache_set(self, key: str, results: List[Dict[str, str]]) -> None:
+        """Write results to the shared cache; failures are logged and ignored"""
+        if self._disk_cache is None:
+            return
+        try:
+            await self._run_off_loop(self._disk_cache.set, key, results)
+        except sqlite3.Error as e:
+            logger.warning(f"Search disk cache write failed: {e}")
+    
+    async def _run_off_loop(self, func, *args):
+        """Run a blocking call in the default executor, keeping the event loop free"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
     
     async def _search_google(self, sentence: str) -> List[Dict[str, str]]:
         """Search using Google Custom Search API (requires API key)"""
@@ -177,46 +373,16 @@ class PlagiarismDetector:
             
             logger.info(f"Bing search URL: {url}")
             
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            logger.info(f"Bing response status: {response.status_code}")
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            await self._throttle('bing')
+            content = await self._fetch(url)
             
-            results = []
-            
-            # Parse Bing search results
-            search_results = soup.find_all('li', {'class': 'b_algo'})
-            logger.info(f"Found {len(search_results)} Bing results")
-            
-            for result in search_results[:self.max_search_results]:
-                try:
-                    title_elem = result.find('h2')
-                    link_elem = title_elem.find('a') if title_elem else None
-                    snippet_elem = result.find('p')
-                    
-                    if link_elem and snippet_elem:
-                        title = title_elem.get_text(strip=True)
-                        url = link_elem.get('href', '')
-                        snippet = snippet_elem.get_text(strip=True)
-                        
-                        if title and url and snippet:
-                            results.append({
-                                'title': title,
-                                'url': url,
-                                'snippet': snippet,
-                                'source': 'bing'
-                            })
-                
-                except Exception as e:
-                    logger.error(f"Error parsing Bing result: {e}")
-                    continue
+            # Parsing a results page takes long enough to stall other searches
+            results = await self._run_off_loop(self._parse_bing_results, content)
             
             logger.info(f"Successfully parsed {len(results)} Bing results")
             return results
             
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Bing search request failed: {e}")
             return []
         except Exception as e:
@@ -233,58 +399,97 @@ class PlagiarismDetector:
             
             logger.info(f"DuckDuckGo search URL: {url}")
             
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            logger.info(f"DuckDuckGo response status: {response.status_code}")
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            await self._throttle('duckduckgo')
+            content = await self._fetch(url)
             
-            results = []
-            
-            # Parse DuckDuckGo results - updated selectors
-            search_results = soup.find_all('div', {'class': 'web-result'})
-            if not search_results:
-                search_results = soup.find_all('div', class_=re.compile(r'result'))
-            
-            logger.info(f"Found {len(search_results)} DuckDuckGo results")
-            
-            for result in search_results[:self.max_search_results]:
-                try:
-                    title_elem = result.find('a', {'class': 'result__a'}) or result.find('h2')
-                    snippet_elem = result.find('div', {'class': 'result__snippet'}) or result.find('p')
-                    
-                    if title_elem and snippet_elem:
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        snippet = snippet_elem.get_text(strip=True)
-                        
-                        # Fix relative URLs
-                        if url.startswith('/'):
-                            url = 'https://duckduckgo.com' + url
-                        
-                        if title and url and snippet:
-                            results.append({
-                                'title': title,
-                                'url': url,
-                                'snippet': snippet,
-                                'source': 'duckduckgo'
-                            })
-                
-                except Exception as e:
-                    logger.error(f"Error parsing DuckDuckGo result: {e}")
-                    continue
+            results = await self._run_off_loop(self._parse_duckduckgo_results, content)
             
             logger.info(f"Successfully parsed {len(results)} DuckDuckGo results")
             return results
             
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"DuckDuckGo search request failed: {e}")
             return []
         except Exception as e:
             logger.error(f"DuckDuckGo search failed: {e}")
             return []
     
+    def _parse_bing_results(self, content: bytes) -> List[Dict[str, str]]:
+        """Extract results from a Bing results page"""
+        soup = BeautifulSoup(content, _HTML_PARSER, parse_only=_BING_RESULTS)
+        
+        results = []
+        
+        # Parse Bing search results
+        search_results = soup.find_all('li', {'class': 'b_algo'})
+        logger.info(f"Found {len(search_results)} Bing results")
+        
+        for result in search_results[:self.max_search_results]:
+            try:
+                title_elem = result.find('h2')
+                link_elem = title_elem.find('a') if title_elem else None
+                snippet_elem = result.find('p')
+                
+                if link_elem and snippet_elem:
+                    title = title_elem.get_text(strip=True)
+                    url = link_elem.get('href', '')
+                    snippet = snippet_elem.get_text(strip=True)
+                    
+                    if title and url and snippet:
+                        results.append({
+                            'title': title,
+                            'url': url,
+                            'snippet': snippet,
+                            'source': 'bing'
+                        })
+            
+            except Exception as e:
+                logger.error(f"Error parsing Bing result: {e}")
+                continue
+        
+        return results
+    
+    def _parse_duckduckgo_results(self, content: bytes) -> List[Dict[str, str]]:
+        """Extract results from a DuckDuckGo results page"""
+        soup = BeautifulSoup(content, _HTML_PARSER, parse_only=_DDG_RESULTS)
+        
+        results = []
+        
+        # Parse DuckDuckGo results - updated selectors
+        search_results = soup.find_all('div', {'class': 'web-result'})
+        if not search_results:
+            search_results = soup.find_all('div', class_=_RESULT_CLASS_RE)
+        
+        logger.info(f"Found {len(search_results)} DuckDuckGo results")
+        
+        for result in search_results[:self.max_search_results]:
+            try:
+                title_elem = result.find('a', {'class': 'result__a'}) or result.find('h2')
+                snippet_elem = result.find('div', {'class': 'result__snippet'}) or result.find('p')
+                
+                if title_elem and snippet_elem:
+                    title = title_elem.get_text(strip=True)
+                    url = title_elem.get('href', '')
+                    snippet = snippet_elem.get_text(strip=True)
+                    
+                    # Fix relative URLs
+                    if url.startswith('/'):
+                        url = 'https://duckduckgo.com' + url
+                    
+                    if title and url and snippet:
+                        results.append({
+                            'title': title,
+                            'url': url,
+                            'snippet': snippet,
+                            'source': 'duckduckgo'
+                        })
+            
+            except Exception as e:
+                logger.error(f"Error parsing DuckDuckGo result: {e}")
+                continue
+        
+        return results
+    
     def _deduplicate_results(self, results: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """Remove duplicate search results"""
         seen_urls = set()
@@ -299,15 +504,37 @@ class PlagiarismDetector:
         return unique_results
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity between two texts using difflib"""
-        # Normalize texts
-        text1_normalized = re.sub(r'[^\w\s]', '', text1.lower())
-        text2_normalized = re.sub(r'[^\w\s]', '', text2.lower())
-        
-        # Calculate sequence similarity
-        similarity = difflib.SequenceMatcher(None, text1_normalized, text2_normalized).ratio()
+        """Calculate similarity between two texts using rapidfuzz"""
+        return self._similarity_many(text1, [text2])[0]
+    
+    def _similarity_many(self, sentence: str, snippets: List[str], score_cutoff: float = 0.0) -> List[float]:
+        """
+        Similarity of one sentence to each snippet (normalized Indel distance);
+        scores below score_cutoff come back as 0.0
+        """
+        similarities = [0.0] * len(snippets)
+        if not snippets:
+            return similarities
         
-        return similarity
+        # One call scores every snippet in C; rapidfuzz stops early once a
+        # pair can no longer reach the cutoff and leaves it out
+        scored = process.extract(
+            self._normalize_for_similarity(sentence),
+            [self._normalize_for_similarity(snippet) for snippet in snippets],
+            scorer=fuzz.ratio,
+            processor=None,
+            score_cutoff=score_cutoff * 100,
+            limit=None
+        )
+        for _, score, index in scored:
+            similarities[index] = score / 100.0
+        return similarities
+    
+    def _normalize_for_similarity(self, text: str) -> str:
+        """Lowercase and drop punctuation before comparing"""
+        text = text.lower().translate(_ASCII_NONWORD_TABLE)
+        # Only non-ASCII text can still hold punctuation the table missed
+        return text if text.isascii() else _NONWORD_RE.sub('', text)
     
     def _classify_match(self, similarity: float) -> str:
         """Classify the type of match based on similarity score"""
@@ -341,7 +568,7 @@ class PlagiarismDetector:
                 domain = urlparse(url).netloc
                 
                 sources[url] = {
-                    'id': str(hash(url))[-8:],  # Simple ID generation
+                    'id': hashlib.blake2b(url.encode(), digest_size=4).hexdigest(),  # Stable across processes
                     'title': match.get('source_title', 'Unknown Title'),
                     'url': url,
                     'domain': domain,
@@ -352,14 +579,7 @@ class PlagiarismDetector:
     
     def _determine_source_type(self, domain: str) -> str:
         """Determine the type of source based on domain"""
-        if any(academic in domain.lower() for academic in ['edu', 'scholar', 'researchgate', 'arxiv', 'pubmed']):
-            return 'academic'
-        elif any(news in domain.lower() for news in ['news', 'cnn', 'bbc', 'reuters', 'times']):
-            return 'news'
-        elif 'wikipedia' in domain.lower():
-            return 'encyclopedia'
-        else:
-            return 'web'
+        return _source_type_for_domain(domain)
     
     def _create_empty_result(self) -> Dict[str, Any]:
         """Create empty result when no analysis possible"""
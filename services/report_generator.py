@@ -5,26 +5,84 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch, mm
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 import base64
+import multiprocessing
+import os
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Forking a multi-threaded server (event loop, threadpool) can deadlock the
+# child, so workers start from a clean interpreter instead
+_PROCESS_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+def _clip(text: str, limit: int) -> str:
+    """Truncate text to limit characters, marking the cut with '...'"""
+    return text if len(text) <= limit else text[:limit] + '...'
+
 class ReportGenerator:
     """
     Generate comprehensive PDF reports for plagiarism analysis (Simplified Version)
     """
     
+    # Built once and shared by every report
+    _STYLES = getSampleStyleSheet()
+    _DOC_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    # Tables with a header row (matches and sources)
+    _RESULTS_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
     def __init__(self):
-        self.styles = getSampleStyleSheet()
+        self.styles = self._STYLES
     
     def generate_comprehensive_report(self, analysis_data: Dict[str, Any], include_citations: bool = True) -> str:
         """
         Generate a comprehensive PDF report and return as base64 string
         """
+        pdf_data = self.generate_pdf_bytes(analysis_data, include_citations)
+        return base64.b64encode(pdf_data).decode('ascii')
+    
+    def generate_many(self, analyses: List[Dict[str, Any]], max_workers: Optional[int] = None) -> List[str]:
+        """
+        Generate comprehensive reports for several analyses in parallel worker
+        processes (ReportLab layout is pure Python and holds the GIL), returning
+        base64 strings in input order
+        """
+        if len(analyses) <= 1:
+            return [self.generate_comprehensive_report(analysis_data) for analysis_data in analyses]
+        
+        workers = min(len(analyses), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(_PROCESS_START_METHOD)
+        ) as executor:
+            return list(executor.map(_build_report, analyses))
+    
+    def generate_pdf_bytes(self, analysis_data: Dict[str, Any], include_citations: bool = True) -> bytes:
+        """
+        Generate a comprehensive PDF report as raw bytes, for callers that
+        stream it or encode it themselves
+        """
         try:
             buffer = BytesIO()
             doc = SimpleDocTemplate(
@@ -54,17 +112,7 @@ class ReportGenerator:
             ]
             
             doc_table = Table(doc_info_data, colWidths=[60*mm, 90*mm])
-            doc_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            doc_table.setStyle(self._DOC_TABLE_STYLE)
             
             story.append(doc_table)
             story.append(Spacer(1, 20))
@@ -91,19 +139,24 @@ class ReportGenerator:
                 matches = analysis_data.get('matches', [])
                 sorted_matches = sorted(matches, key=lambda x: x.get('similarity', 0), reverse=True)
                 
-                for i, match in enumerate(sorted_matches[:5], 1):  # Show top 5 matches
-                    story.append(Paragraph(f"Match {i}", self.styles['Heading2']))
-                    
-                    match_info = f"""
-                    Similarity: {match.get('similarity', 0):.1%}<br/>
-                    Source: {match.get('source_title', 'Unknown')}<br/>
-                    Type: {match.get('match_type', 'Unknown').title()}<br/>
-                    Original: "{match.get('original_text', '')[:100]}..."<br/>
-                    Found: "{match.get('matched_text', '')[:100]}..."
-                    """
-                    
-                    story.append(Paragraph(match_info, self.styles['Normal']))
-                    story.append(Spacer(1, 10))
+                # One table for the top matches, laid out in a single pass
+                matches_data = [['#', 'Similarity', 'Type', 'Source', 'Excerpt']]
+                matches_data.extend(
+                    [
+                        str(i),
+                        f"{match.get('similarity', 0):.1%}",
+                        match.get('match_type', 'Unknown').title(),
+                        _clip(match.get('source_title', 'Unknown'), 28),
+                        _clip(match.get('original_text', ''), 40)
+                    ]
+                    for i, match in enumerate(sorted_matches[:20], 1)  # Show top 20 matches
+                )
+                
+                matches_table = Table(matches_data, colWidths=[10*mm, 20*mm, 25*mm, 50*mm, 65*mm], repeatRows=1)
+                matches_table.setStyle(self._RESULTS_TABLE_STYLE)
+                
+                story.append(matches_table)
+                story.append(Spacer(1, 20))
             
             # Sources
             if analysis_data.get('sources'):
@@ -118,14 +171,7 @@ class ReportGenerator:
                     ])
                 
                 sources_table = Table(sources_data, colWidths=[60*mm, 40*mm, 40*mm])
-                sources_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
+                sources_table.setStyle(self._RESULTS_TABLE_STYLE)
                 
                 story.append(sources_table)
             
@@ -147,14 +193,11 @@ class ReportGenerator:
             # Build PDF
             doc.build(story)
             
-            # Convert to base64
-            buffer.seek(0)
             pdf_data = buffer.getvalue()
             buffer.close()
             
-            base64_pdf = base64.b64encode(pdf_data).decode('utf-8')
             logger.info("PDF report generated successfully")
-            return base64_pdf
+            return pdf_data
             
         except Exception as e:
             logger.error(f"PDF report generation failed: {e}")
@@ -200,11 +243,10 @@ class ReportGenerator:
             # Build PDF
             doc.build(story)
             
-            buffer.seek(0)
             pdf_data = buffer.getvalue()
             buffer.close()
             
-            return base64.b64encode(pdf_data).decode('utf-8')
+            return base64.b64encode(pdf_data).decode('ascii')
             
         except Exception as e:
             logger.error(f"Summary report generation failed: {e}")
@@ -218,4 +260,8 @@ class ReportGenerator:
                 return dt.strftime("%B %d, %Y at %I:%M %p")
             return "Unknown"
         except:
-            return "Unknown"
\ No newline at end of file
+            return "Unknown"
+
+def _build_report(analysis_data: Dict[str, Any]) -> str:
+    """Worker-process entry point for generate_many"""
+    return ReportGenerator().generate_comprehensive_report(analysis_data)
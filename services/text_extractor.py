@@ -1,31 +1,232 @@
 # services/text_extractor.py - Phase 2: Text Extraction Service
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-import chardet
-from PyPDF2 import PdfReader
-from docx import Document
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional, Tuple
+import pypdfium2 as pdfium
 import io
+import zipfile
+import xml.etree.ElementTree as ET
+
+from .cache import TTLCache
+
+# Compiled charset detector when available (same detect() API as chardet)
+try:
+    import cchardet as _chardet
+except ImportError:
+    import chardet as _chardet
 
 logger = logging.getLogger(__name__)
 
+# Bytes of a text file sampled for encoding detection, fed to the detector
+# a chunk at a time until it is confident
+ENCODING_SNIFF_SIZE = 64 * 1024
+ENCODING_SNIFF_CHUNK = 4 * 1024
+
+# Detection results by digest of the sampled bytes, so re-uploaded files
+# skip the detector; shared by the extraction threads
+_encoding_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+_encoding_cache_lock = threading.Lock()
+
+def _sniff_encoding(data: bytes) -> Dict[str, Any]:
+    """Detect the encoding of text from its leading bytes, reusing earlier results"""
+    sample = data[:ENCODING_SNIFF_SIZE]
+    key = hashlib.blake2b(sample, digest_size=16).digest()
+    with _encoding_cache_lock:
+        detected = _encoding_cache.get(key)
+    if detected is None:
+        detected = _detect_sample(sample)
+        with _encoding_cache_lock:
+            _encoding_cache.set(key, detected)
+    return detected
+
+def _detect_sample(sample: bytes) -> Dict[str, Any]:
+    """Feed a sample to the detector a chunk at a time, stopping once it is sure"""
+    detector = _chardet.UniversalDetector()
+    for start in range(0, len(sample), ENCODING_SNIFF_CHUNK):
+        detector.feed(sample[start:start + ENCODING_SNIFF_CHUNK])
+        if detector.done:
+            break
+    detector.close()
+    return detector.result
+
+def _detect_encoding(data: bytes) -> Optional[str]:
+    """
+    Encoding of bytes that are not UTF-8, or None when the detector is not
+    confident
+    """
+    detected = _sniff_encoding(data)
+    if detected.get('confidence', 0) < 0.7:
+        return None
+    return detected.get('encoding')
+
+def _decode_text(data: bytes) -> str:
+    """Decode text of unknown encoding"""
+    # Most uploads are UTF-8 (or ASCII): decode directly, dropping any BOM,
+    # and only run encoding detection when that fails
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        pass
+    
+    # Detection only samples the start of the file, so the detected encoding
+    # can still fail further in (e.g. an ASCII-only sample); fall back then
+    encoding = _detect_encoding(data)
+    if encoding is not None:
+        try:
+            return data.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            pass
+    
+    # If confidence is too low or the detected encoding does not fit, try
+    # common encodings (UTF-8 and ASCII are already ruled out)
+    for enc in ('latin1', 'cp1252'):
+        try:
+            return data.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    
+    # If all fail, use utf-8 with error handling
+    return data.decode('utf-8', errors='ignore')
+
+def _with_counts(text: str) -> Tuple[str, int, int]:
+    """Text with its word and character counts"""
+    return text, len(text.split()), len(text)
+
+def _read_text(data: bytes) -> Tuple[str, int, int]:
+    """Decoded, trimmed text of a text file and its counts"""
+    return _with_counts(_decode_text(data).strip())
+
+# PDFium is not thread-safe: extraction threads take turns using it (worker
+# processes each have their own copy)
+_pdfium_lock = threading.Lock()
+
+# WordprocessingML elements read when extracting text from .docx files
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_PARAGRAPH_TAG = f"{_WORD_NAMESPACE}p"
+_DOCX_TEXT_TAG = f"{_WORD_NAMESPACE}t"
+_DOCX_TAB_TAG = f"{_WORD_NAMESPACE}tab"
+_DOCX_BREAK_TAGS = {f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"}
+_DOCX_TABLE_TAG = f"{_WORD_NAMESPACE}tbl"
+_DOCX_CELL_TAG = f"{_WORD_NAMESPACE}tc"
+
+def _pdf_page_texts(pdf: "pdfium.PdfDocument", start: int, stop: int) -> List[str]:
+    """Text of the non-blank pages in [start, stop) of an open document"""
+    text_parts = []
+    for page_num in range(start, stop):
+        try:
+            page = pdf[page_num]
+            textpage = page.get_textpage()
+            try:
+                # PDFium reports line breaks as \r\n; normalize to \n
+                page_text = textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                page.close()
+            if page_text:
+                text_parts.append(page_text)
+        except Exception as e:
+            logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+            continue
+    return text_parts
+
+def _join_pages(text_parts: List[str]) -> Tuple[str, int, int]:
+    """Text of a PDF from its page texts, and its counts"""
+    # Only the ends of the joined text need trimming
+    return _with_counts("\n\n".join(text_parts).strip())
+
+def _extract_pdf_pages(file_content: bytes, start: int, stop: int) -> List[str]:
+    """Worker-process entry point: each worker opens its own copy of the document"""
+    pdf = pdfium.PdfDocument(file_content)
+    try:
+        return _pdf_page_texts(pdf, start, stop)
+    finally:
+        pdf.close()
+
+# Worker processes shared by every extractor, started on first use. They are
+# started by a fork server (or spawned), never forked from this process, so
+# they cannot inherit a lock or PDFium state held by one of its threads
+EXTRACTOR_WORKERS = int(os.environ.get('EXTRACTOR_WORKERS', 0)) or os.cpu_count() or 1
+_PROCESS_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared worker pool, creating it on first use"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=EXTRACTOR_WORKERS,
+                mp_context=multiprocessing.get_context(_PROCESS_START_METHOD)
+            )
+        return _process_pool
+
+async def _run_in_process(func, *args):
+    """
+    Run func in the shared worker pool. The pool is never joined on the event
+    loop; one whose worker died is dropped so the next call starts a new one
+    """
+    pool = _get_process_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        global _process_pool
+        with _process_pool_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        pool.shutdown(wait=False)
+        raise
+
 class TextExtractor:
     """Service for extracting text from various file formats"""
     
     def __init__(self):
-        self.supported_formats = {'.pdf', '.docx', '.txt'}
+        # Extraction handler per file extension
+        self._handlers = {
+            '.pdf': self._extract_from_pdf,
+            '.docx': self._extract_from_docx,
+            '.txt': self._extract_from_txt
+        }
+        self.supported_formats = set(self._handlers)
+        
+        # Parsing runs in worker threads/processes; cap how many documents are
+        # parsed at once so bursts of uploads cannot exhaust memory
+        self.max_concurrent_extractions = os.cpu_count() or 1
+        self._extraction_slots = asyncio.Semaphore(self.max_concurrent_extractions)
+        
+        # PDFs are split into page ranges of at least this many pages, one per
+        # worker process; shorter documents are extracted in-process
+        self.pdf_pages_per_worker = 16
+        self.max_pdf_workers = os.cpu_count() or 1
+        
+        # Extracted text by (content hash, extension), so re-submitted
+        # documents are not parsed again; large uploads are not cached
+        self._text_cache = TTLCache(maxsize=256, ttl=3600)
+        self.max_cached_size = 8 * 1024 * 1024
+        
+        # Documents extract_batch has in the shared worker pool at once
+        self.batch_workers = EXTRACTOR_WORKERS
     
     def get_supported_formats(self) -> list:
         """Get list of supported file formats"""
         return list(self.supported_formats)
     
-    async def extract_text(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def extract_text(self, file_content: bytes, filename: str,
+                           return_bytes: bool = False) -> Dict[str, Any]:
         """
         Extract text from uploaded file
         
         Args:
             file_content: Raw file content as bytes
             filename: Original filename with extension
+            return_bytes: Return the text UTF-8 encoded, for consumers that
+                tokenize or hash bytes
             
         Returns:
             Dictionary containing extracted text and metadata
@@ -33,25 +234,27 @@ class TextExtractor:
         try:
             file_extension = os.path.splitext(filename)[1].lower()
             
-            if file_extension not in self.supported_formats:
+            handler = self._handlers.get(file_extension)
+            if handler is None:
                 raise ValueError(f"Unsupported file format: {file_extension}")
             
-            # Extract text based on file type
-            if file_extension == '.pdf':
-                extracted_text = await self._extract_from_pdf(file_content)
-            elif file_extension == '.docx':
-                extracted_text = await self._extract_from_docx(file_content)
-            elif file_extension == '.txt':
-                extracted_text = await self._extract_from_txt(file_content)
-            else:
-                raise ValueError(f"Handler not implemented for: {file_extension}")
+            cache_key = None
+            if len(file_content) <= self.max_cached_size:
+                cache_key = (hashlib.sha256(file_content).digest(), file_extension)
+                extracted = self._text_cache.get(cache_key)
             
-            # Calculate basic statistics
-            word_count = len(extracted_text.split()) if extracted_text else 0
-            char_count = len(extracted_text) if extracted_text else 0
+            if cache_key is None or extracted is None:
+                # Extract text based on file type; handlers count words and
+                # characters in their worker, alongside the parsing
+                async with self._extraction_slots:
+                    extracted = await handler(file_content)
+                if cache_key is not None:
+                    self._text_cache.set(cache_key, extracted)
+            
+            extracted_text, word_count, char_count = extracted
             
             return {
-                "text": extracted_text,
+                "text": extracted_text.encode('utf-8') if return_bytes else extracted_text,
                 "word_count": word_count,
                 "character_count": char_count,
                 "file_type": file_extension,
@@ -63,7 +266,7 @@ class TextExtractor:
         except Exception as e:
             logger.error(f"Text extraction failed for {filename}: {str(e)}")
             return {
-                "text": "",
+                "text": b"" if return_bytes else "",
                 "word_count": 0,
                 "character_count": 0,
                 "file_type": file_extension if 'file_extension' in locals() else "unknown",
@@ -72,95 +275,150 @@ class TextExtractor:
                 "error": str(e)
             }
     
-    async def _extract_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file"""
+    async def extract_batch(self, files: List[Tuple[bytes, str]],
+                            max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extract text from several uploads, given as (file_content, filename)
+        pairs, in parallel worker processes; results are in input order
+        """
+        if len(files) <= 1:
+            return [await self.extract_text(file_content, filename) for file_content, filename in files]
+        
+        slots = asyncio.Semaphore(max_workers or self.batch_workers)
+        
+        async def extract_one(file_content: bytes, filename: str) -> Dict[str, Any]:
+            async with slots:
+                return await _run_in_process(_extract_one, file_content, filename)
+        
+        return list(await asyncio.gather(*(
+            extract_one(file_content, filename) for file_content, filename in files
+        )))
+    
+    async def _extract_from_pdf(self, file_content: bytes) -> Tuple[str, int, int]:
+        """Extract text from PDF file, with its word and character counts"""
         try:
-            # Create a file-like object from bytes
-            pdf_file = io.BytesIO(file_content)
-            
-            # Read PDF
-            reader = PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            text_parts = []
-            for page_num, page in enumerate(reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text_parts.append(page_text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                    continue
-            
-            extracted_text = "\n\n".join(text_parts)
-            
-            if not extracted_text.strip():
+            # Short documents are read in a worker thread, long ones are split
+            # across worker processes
+            page_count, extracted = await asyncio.to_thread(self._read_short_pdf, file_content)
+            if extracted is None:
+                text_parts = await self._extract_pdf_parallel(file_content, page_count)
+                extracted = await asyncio.to_thread(_join_pages, text_parts)
+            
+            if not extracted[0]:
                 raise ValueError("No readable text found in PDF")
             
-            return extracted_text.strip()
+            return extracted
             
         except Exception as e:
             raise Exception(f"PDF extraction failed: {str(e)}")
     
-    async def _extract_from_docx(self, file_content: bytes) -> str:
-        """Extract text from DOCX file"""
+    def _pdf_workers(self, page_count: int) -> int:
+        """Number of worker processes to split a document of page_count pages across"""
+        return min(self.max_pdf_workers, page_count // self.pdf_pages_per_worker)
+    
+    def _read_short_pdf(self, file_content: bytes) -> Tuple[int, Optional[Tuple[str, int, int]]]:
+        """
+        Page count of a PDF and, unless it is long enough to split across
+        worker processes, its text and counts
+        """
+        with _pdfium_lock:
+            # PDFium reads the bytes directly, no file-like wrapper needed
+            pdf = pdfium.PdfDocument(file_content)
+            try:
+                page_count = len(pdf)
+                if self._pdf_workers(page_count) > 1:
+                    return page_count, None
+                return page_count, _join_pages(_pdf_page_texts(pdf, 0, page_count))
+            finally:
+                pdf.close()
+    
+    async def _extract_pdf_parallel(self, file_content: bytes, page_count: int) -> List[str]:
+        """
+        Extract contiguous page ranges in worker processes (PDFium is not
+        thread-safe, so threads could not read pages in parallel), returning
+        page texts in document order
+        """
+        workers = self._pdf_workers(page_count)
+        bounds = [page_count * i // workers for i in range(workers + 1)]
+        ranges = await asyncio.gather(*(
+            _run_in_process(_extract_pdf_pages, file_content, start, stop)
+            for start, stop in zip(bounds, bounds[1:])
+        ))
+        return [page_text for page_texts in ranges for page_text in page_texts]
+    
+    async def _extract_from_docx(self, file_content: bytes) -> Tuple[str, int, int]:
+        """Extract text from DOCX file, with its word and character counts"""
         try:
-            # Create a file-like object from bytes
-            docx_file = io.BytesIO(file_content)
-            
-            # Read DOCX
-            document = Document(docx_file)
-            
-            # Extract text from all paragraphs
-            text_parts = []
-            for paragraph in document.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text.strip())
-            
-            # Also extract text from tables if present
-            for table in document.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_parts.append(cell.text.strip())
+            # Every part is already stripped and non-empty
+            extracted = await asyncio.to_thread(self._read_docx, file_content)
             
-            extracted_text = "\n\n".join(text_parts)
-            
-            if not extracted_text.strip():
+            if not extracted[0]:
                 raise ValueError("No readable text found in DOCX")
             
-            return extracted_text.strip()
+            return extracted
             
         except Exception as e:
             raise Exception(f"DOCX extraction failed: {str(e)}")
     
-    async def _extract_from_txt(self, file_content: bytes) -> str:
-        """Extract text from plain text file"""
+    def _read_docx(self, file_content: bytes) -> Tuple[str, int, int]:
+        """Text of a DOCX file (body paragraphs, then table cells) and its counts"""
+        # Stream text runs straight out of word/document.xml instead of
+        # building python-docx's object model for the whole document
+        text_parts = []     # Body paragraphs
+        table_parts = []    # Table cells, appended after the body
+        cell_paragraphs = []
+        runs = []
+        table_depth = 0
+        
+        with zipfile.ZipFile(io.BytesIO(file_content)) as docx, docx.open('word/document.xml') as document_xml:
+            for event, elem in ET.iterparse(document_xml, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == _DOCX_TABLE_TAG:
+                        table_depth += 1
+                elif tag == _DOCX_TEXT_TAG:
+                    runs.append(elem.text or "")
+                elif tag == _DOCX_TAB_TAG:
+                    runs.append("\t")
+                elif tag in _DOCX_BREAK_TAGS:
+                    runs.append("\n")
+                elif tag == _DOCX_PARAGRAPH_TAG:
+                    paragraph = "".join(runs)
+                    runs.clear()
+                    elem.clear()
+                    if table_depth:
+                        cell_paragraphs.append(paragraph)
+                    else:
+                        paragraph = paragraph.strip()
+                        if paragraph:
+                            text_parts.append(paragraph)
+                elif tag == _DOCX_CELL_TAG:
+                    cell = "\n".join(cell_paragraphs).strip()
+                    cell_paragraphs.clear()
+                    if cell:
+                        table_parts.append(cell)
+                elif tag == _DOCX_TABLE_TAG:
+                    table_depth -= 1
+        
+        text_parts.extend(table_parts)
+        return _with_counts("\n\n".join(text_parts))
+    
+    async def _extract_from_txt(self, file_content: bytes) -> Tuple[str, int, int]:
+        """Extract text from plain text file, with its word and character counts"""
         try:
-            # Detect encoding
-            detected = chardet.detect(file_content)
-            encoding = detected.get('encoding', 'utf-8')
-            
-            # If confidence is too low, try common encodings
-            if detected.get('confidence', 0) < 0.7:
-                encodings_to_try = ['utf-8', 'ascii', 'latin1', 'cp1252']
-                
-                for enc in encodings_to_try:
-                    try:
-                        text = file_content.decode(enc)
-                        return text.strip()
-                    except UnicodeDecodeError:
-                        continue
-                
-                # If all fail, use utf-8 with error handling
-                text = file_content.decode('utf-8', errors='ignore')
-            else:
-                text = file_content.decode(encoding)
-            
-            if not text.strip():
+            extracted = await asyncio.to_thread(_read_text, file_content)
+            
+            if not extracted[0]:
                 raise ValueError("No readable text found in file")
             
-            return text.strip()
+            return extracted
             
         except Exception as e:
-            raise Exception(f"Text file extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Text file extraction failed: {str(e)}")
+
+def _extract_one(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """Worker-process entry point for extract_batch"""
+    extractor = TextExtractor()
+    # Documents are already spread across processes; don't split PDFs further
+    extractor.max_pdf_workers = 1
+    return asyncio.run(extractor.extract_text(file_content, filename))